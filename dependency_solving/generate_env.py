@@ -1,14 +1,17 @@
-import copy
-import neo4j
-from packaging.version import parse
-from packaging.specifiers import SpecifierSet
-
 from .smt_solver import DepOptimizer
 from .pip_solver.resolver import Resolution
+from .pip_solver.structs import Requirement
 import sys
 sys.path.append("..")
-from kg_api.kg_query import QueryApplication
 from utils.handle_unknown import get_similar_packages
+from utils.version_window import get_version_windows
+from utils.specifier_engine import IntervalSet, VersionSpace, VersionSet
+from utils.version_table import version_table
+from utils.variables import VERSION_WINDOW_SIZES, VERSION_WINDOW_SINCE
+
+
+# the key was not in the dict before the change
+_MISSING = object()
 
 
 class EnvGenerator(object):
@@ -17,12 +20,11 @@ class EnvGenerator(object):
         self.calculator = ratio_calculator
 
         self.smt_solver = DepOptimizer()
-        self.pip_solver = Resolution(kg_querier)
-
-        self.pkg_version_dict = {}
+        self.pip_solver = Resolution(kg_querier, get_version_windows(VERSION_WINDOW_SIZES, VERSION_WINDOW_SINCE))
 
         # the results from candidate discovery
         self.python_candidates = None       # [str, ]
+        self.python_space = None            # VersionSpace of the first python_candidates, the others are its subsets
         self.pv_candidates = None           # {top module: {pkg: [(version, spec, repos_spec, matching_degree), ]}}
         self.similarity_dict = None         # {top_module: {pkg: similarity}}
         
@@ -40,10 +42,14 @@ class EnvGenerator(object):
 
         self.used_pkgs = None               # {top_module: set(pkg, )}
         self.unknown_modules = None         # set(module, )
+
+        # the changes of pv_candidates, selected_pvs and avail_pyvers since the backup: [(dict, key, old value), ]
+        self._undo_log = None
     
 
     def _clean_intermediate_state(self):
         self.python_candidates = []
+        self.python_space = VersionSpace([])
         self.pv_candidates = {}
         self.similarity_dict = {}
         
@@ -58,42 +64,64 @@ class EnvGenerator(object):
         self.extra_deps = {}
         self.used_pkgs = {}
         self.unknown_modules = set()
+        self._undo_log = None
+    
+
+    def _set_item(self, d, key, value):
+        # the lists of versions are replaced instead of modified, only the dicts are logged
+        if self._undo_log is not None:
+            self._undo_log.append((d, key, d.get(key, _MISSING)))
+        d[key] = value
+    
+
+    def _pop_item(self, d, key):
+        if self._undo_log is not None:
+            self._undo_log.append((d, key, d.get(key, _MISSING)))
+        return d.pop(key)
     
 
     def backup_state(self):
-        return self.python_candidates[:], copy.deepcopy(self.pv_candidates), self.selected_pyvers[:], copy.deepcopy(self.selected_pvs), copy.deepcopy(self.avail_pyvers)
+        # the lists of Python versions are replaced instead of modified
+        self._undo_log = []
+        return self.python_candidates, self.selected_pyvers, self._undo_log
     
     def restore_state(self, backup):
-        self.python_candidates, self.pv_candidates, self.selected_pyvers, self.selected_pvs, self.avail_pyvers = backup
+        # undo the changes since the backup
+        self.python_candidates, self.selected_pyvers, undo_log = backup
+        for d, key, value in reversed(undo_log):
+            if value is _MISSING:
+                d.pop(key, None)
+            else:
+                d[key] = value
+        
+        self._undo_log = None
+    
+    def release_state(self):
+        # keep the changes since the backup
+        self._undo_log = None
     
 
     def _cal_avail_pyvers_for_versions(self, v_list):
         # find available Python versions for v_list
         py_reqs = [(item[1], item[2]) for item in v_list]
 
-        avail_pythons = []
+        avail_pythons = IntervalSet()
         for meta_spec, repos_spec in py_reqs:
-            meta_spec_obj = SpecifierSet(meta_spec)
-            repos_spec_list = [SpecifierSet(spec) for spec in repos_spec.split(';')]
-
-            for pyver in self.python_candidates:
-                # satify metadata
-                if pyver not in meta_spec_obj:
-                    continue
-
-                # satify repos spec
-                for spec in repos_spec_list:
-                    if pyver in spec:
-                        avail_pythons.append(pyver)
-                        break
+            # satify one of repos specs
+            repos_pythons = IntervalSet()
+            for spec in repos_spec.split(';'):
+                repos_pythons |= self.python_space.compile(spec)
+
+            # satify metadata
+            avail_pythons |= self.python_space.compile(meta_spec) & repos_pythons
         
-        return set(avail_pythons)
+        return set(self.python_space.select(self.python_candidates, avail_pythons))
     
 
     def select_pvs_for_module(self, top_module):
         # remove avail_pyvers info for the top module
         if top_module in self.avail_pyvers:
-            self.avail_pyvers.pop(top_module)
+            self._pop_item(self.avail_pyvers, top_module)
 
         # select the maximum mathing degree for top module
         avail_pythons = set()
@@ -120,7 +148,7 @@ class EnvGenerator(object):
                         if len(avail_pkgs) > 0:
                             self.used_pkgs[top_module].update(avail_pkgs)
                             self.similarity_dict[top_module].update({k: v for k, v in unknown_pkg_module_dict[top_module].items() if k in avail_pkgs})
-                            self.pv_candidates[top_module] = {k: v for k, v in candidate_pvs.items() if k in avail_pkgs}
+                            self._set_item(self.pv_candidates, top_module, {k: v for k, v in candidate_pvs.items() if k in avail_pkgs})
                             continue
                 
                 # no available pvs indeed
@@ -137,7 +165,7 @@ class EnvGenerator(object):
             
             # delete the packages with no candidate versions
             for pkg in del_pkgs:
-                pv_info.pop(pkg)
+                self._pop_item(pv_info, pkg)
 
             # Get pv with maximum mathing degree
             for pkg, v_list in pv_info.items():
@@ -151,7 +179,7 @@ class EnvGenerator(object):
                 # remove these pvs in pv_candidates
                 length = len(v_tmp)
                 if length > 0:
-                    pv_info[pkg] = v_list[length:]
+                    self._set_item(pv_info, pkg, v_list[length:])
                     pyver_tmp = self._cal_avail_pyvers_for_versions(v_tmp)
                     if len(pyver_tmp) > 0:
                         # have available pyvers
@@ -159,9 +187,9 @@ class EnvGenerator(object):
                         avail_pythons |= pyver_tmp
 
         # has candidate pvs
-        self.selected_pvs[top_module] = max_pv
+        self._set_item(self.selected_pvs, top_module, max_pv)
         # pyvers
-        self.avail_pyvers[top_module] = avail_pythons
+        self._set_item(self.avail_pyvers, top_module, avail_pythons)
      
 
     def _cal_selected_pyvers(self, use_py2=False):
@@ -235,10 +263,7 @@ class EnvGenerator(object):
             return False
 
         self.python_candidates = python_candidates
-
-        # control the space
-        if len(self.pkg_version_dict) > 200:
-            self.pkg_version_dict = {}
+        self.python_space = VersionSpace(python_candidates)
 
         for top_module in self.pv_candidates:
             self.select_pvs_for_module(top_module)
@@ -250,13 +275,14 @@ class EnvGenerator(object):
         if self.existing_pyver is not None:
             return False
         
-        # adjust the selected pvs
-        if isinstance(constraint, str):
-            constraint = SpecifierSet(constraint)
-
         # backup
         backup = self.backup_state()
-        self.python_candidates = [item for item in self.python_candidates if item in constraint]
+
+        # adjust the selected pvs
+        if isinstance(constraint, str):
+            self.python_candidates = self.python_space.select(self.python_candidates, self.python_space.compile(constraint))
+        else:
+            self.python_candidates = [item for item in self.python_candidates if item in constraint]
 
         old_pyver = self.selected_pyvers[0]
         # selected_pyvers = [item for item in python_candidates if item in self.selected_pyvers]
@@ -267,6 +293,7 @@ class EnvGenerator(object):
 
         self._cal_selected_pyvers()
         if len(self.selected_pyvers) > 0 and self.selected_pyvers[0] != old_pyver:
+            self.release_state()
             return True
         
         self.restore_state(backup)
@@ -325,38 +352,10 @@ class EnvGenerator(object):
             return True
     
 
-    def _get_all_versions_for_package(self, pkg):
-        # get all versions for a package
-        if pkg not in self.pkg_version_dict:
-            with self.kg_querier.driver.session(default_access_mode=neo4j.READ_ACCESS) as session:
-                v_list = session.read_transaction(QueryApplication.get_versions_by_package, pkg)
-            v_list.sort(key=lambda x: parse(x))
-            self.pkg_version_dict[pkg] = v_list
-        
-        return self.pkg_version_dict[pkg]
-    
-
-    def _generate_version_range(self, pkg, version_list):
-        # generate the version range (str) of a package with version list
-        if not version_list:
-            return pkg
-
-        if len(version_list) == 1:
-            return '{}=={}'.format(pkg, version_list[0])
-        
-        min_version = version_list[-1]
-        max_version = version_list[0]
-        req_str = '{}>={},<={}'.format(pkg, min_version, max_version)
-
-        all_version = self._get_all_versions_for_package(pkg)
-        tmp = all_version[all_version.index(min_version):all_version.index(max_version)+1]
+    def _generate_version_set(self, pkg, version_list):
+        # the requirement of a package with the explicit candidate versions
+        return Requirement(pkg, VersionSet(version_list))
 
-        exclude_versions = [item for item in tmp if item not in version_list]
-        for item in exclude_versions:
-            req_str += ',!={}'.format(item)
-        
-        return req_str
-        
 
     def generate_candidate_environment(self, use_py2=False):
         # select a Python version
@@ -401,19 +400,20 @@ class EnvGenerator(object):
         
         for pkg in pv_dict:
             if isinstance(pv_dict[pkg], set):
-                pv_dict[pkg] = sorted(pv_dict[pkg], key=lambda x: parse(x), reverse=True)
-
-        # generate the version range for version candidates
-        installed_list = []
+                pv_dict[pkg] = list(pv_dict[pkg])
+                version_table.sort(pkg, pv_dict[pkg], reverse=True)
 
         # add existing envs
+        existing_list = []
         if self.existing_pvs is not None:
             for p, v in self.existing_pvs.items():
-                installed_list.append('{}=={}'.format(p, v))
+                existing_list.append('{}=={}'.format(p, v))
+        requirements = Resolution.generate_requirements(existing_list)
 
+        # the version sets of version candidates
         for pkg, version_list in pv_dict.items():
             if version_list:
-                installed_list.append(self._generate_version_range(pkg, version_list))
+                requirements.append(self._generate_version_set(pkg, version_list))
 
         extra_deps = {}
         for pkg, dep_set in self.extra_deps.items():
@@ -422,7 +422,7 @@ class EnvGenerator(object):
             for top_module in dep_set:
                 extra_deps[pkg].update(self.installed_module_pkgs.get(top_module, set()))
 
-        pip_res = self.pip_solver.main(Resolution.generate_requirements(installed_list), python_version, extra_deps)
+        pip_res = self.pip_solver.main(requirements, python_version, extra_deps)
         installed_list = []
         if pip_res is None:
             # can't solve
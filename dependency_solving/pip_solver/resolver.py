@@ -1,14 +1,17 @@
 import collections
 import math
-from packaging.specifiers import SpecifierSet
+import time
 from packaging.markers import Marker, InvalidMarker
 import packaging.requirements
 import neo4j
 import sys
 sys.path.append("...")
-from .exceptions import RequirementsConflicted, InconsistentCandidate, ResolutionImpossible, ResolutionTooDeep, ResolverException, ResolverTimeoutException
+from .exceptions import RequirementsConflicted, InconsistentCandidate, ResolutionImpossible, ResolutionTooDeep, ResolutionError, ResolverException, ResolverTimeoutException
 from .structs import State, RequirementInformation, Requirement, Candidate, Criterion
 from kg_api.kg_query import QueryApplication
+from utils.specifier_engine import specifier_engine, VersionSpace
+from utils.version_table import version_table
+from utils.bounded_cache import kg_cache
 
 import signal
 
@@ -17,15 +20,19 @@ def handle_timeout(signum, frame):
 
 
 class Resolution(object):
-    def __init__(self, kg_querier):
+    def __init__(self, kg_querier, version_windows=None):
         # [State, ...]
         self._states = []
 
         self.querier = kg_querier
+        # the windows of candidate versions, widened in order if the resolution fails (None: all versions)
+        self.version_windows = version_windows or [None, ]
+        self.version_window = None
 
         self._user_requested = None       # {package: order}, use for requirements file
         self._known_depths = None         # {package, depth}
         self.candidates_dict = None       # {str: [Candidate]}
+        self.version_spaces = None        # {str: VersionSpace} the ordinals of candidates_dict
 
         self.python_version = None
         self.deadline = None
@@ -44,6 +51,7 @@ class Resolution(object):
         self._user_requested = {}       
         self._known_depths = collections.defaultdict(lambda: math.inf)
         self.candidates_dict = {}
+        self.version_spaces = {}
     
 
     def _append_installations(self, candidate):
@@ -73,12 +81,44 @@ class Resolution(object):
         self._states.append(state)
     
 
+    def _read_versions(self, package):
+        # [(version properties, requires_lang properties), ], shared by the resolutions and the windows
+        key = ('versions', package)
+        version_info = kg_cache.get(key)
+        if version_info is None:
+            with self.querier.driver.session(default_access_mode=neo4j.READ_ACCESS) as session:
+                version_info = session.read_transaction(self.querier.get_versions4package, package)
+
+            # the plain properties instead of the records of the driver
+            version_info = [(dict(v), dict(r) if r is not None else None) for v, r in version_info]
+            kg_cache.put(key, version_info)
+
+        return version_info
+
+
+    def _read_requirements(self, package, version):
+        # [(pkg, requires_pkg properties), ] in the order of the requirements, shared by the resolutions
+        key = ('requirements', package, version)
+        req_list = kg_cache.get(key)
+        if req_list is None:
+            with self.querier.driver.session(default_access_mode=neo4j.READ_ACCESS) as session:
+                req_list = session.read_transaction(self.querier.get_requirements4version, package, version)
+            req_list = [(pkg, dict(rel)) for pkg, rel in req_list]
+            req_list.sort(key=lambda x:x[1]['order'])
+            kg_cache.put(key, req_list)
+
+        return req_list
+
+
     def _get_available_versions(self, package):
         if package in self.candidates_dict:
             return self.candidates_dict[package]
 
-        with self.querier.driver.session(default_access_mode=neo4j.READ_ACCESS) as session:
-            version_info = session.read_transaction(self.querier.get_versions4package, package)
+        # the versions of the requested packages are selected by the discovery
+        window = self.version_window if package not in self._user_requested else None
+        version_info = self._read_versions(package)
+        if window is not None:
+            version_info = window.select(version_info, lambda x: (x[0]['version'], x[0].get('upload_time', None)))
 
         if self.deadline:
             # before the deadline
@@ -92,17 +132,20 @@ class Resolution(object):
         # satify Python version
         ret = []
         for item in version_info:
-            if self.python_version in SpecifierSet(item[1]['specifier']):
+            if specifier_engine.contains(item[1]['specifier'], self.python_version):
                 # check supplement specifier
                 repos_spec = item[1]['repos_spec']
                 for str_spec in repos_spec.split(';'):
-                    if self.python_version in SpecifierSet(str_spec):
+                    if specifier_engine.contains(str_spec, self.python_version):
                         ret.append(Candidate(package, item[0]['version']))
                         break
         
-        ret.sort(key=lambda x:x.version, reverse=True)
+        version_table.sort(package, ret, key=lambda x:x.str_version, reverse=True)
+        for i, candidate in enumerate(ret):
+            candidate.ordinal = i
         
         self.candidates_dict[package] = ret
+        self.version_spaces[package] = VersionSpace([x.version for x in ret])
         return ret
 
     
@@ -122,7 +165,8 @@ class Resolution(object):
             information = [RequirementInformation(requirement, parent), ]
         
         # calculate candidates for this package
-        candidates = [item for item in last_candidates if item.version in requirement.specifier]
+        intervals = self.version_spaces[identifier].compile(requirement.specifier)
+        candidates = [item for item in last_candidates if item.ordinal in intervals]
         
         criterion = Criterion(
             candidates=candidates,
@@ -142,17 +186,19 @@ class Resolution(object):
         criterion = criteria.get(identifier, None)
 
         information = []
-        spec = SpecifierSet('', prereleases=True)
+        specifiers = [specifier_engine.get_specifier('', prereleases=True), ]
         extra = set()
         for item in criterion.information:
             if item.parent is None or item.parent.name != parent.name:
                 information.append(item)
-                spec &= item.requirement.specifier
+                specifiers.append(item.requirement.specifier)
                 extra.update(item.requirement.extra)
 
         incompatibilities = criterion.incompatibilities[:]
         # re-calculate the candidates
-        candidates = [item for item in self._get_available_versions(identifier) if item not in incompatibilities and item.version in spec]
+        available_versions = self._get_available_versions(identifier)
+        intervals = self.version_spaces[identifier].compile_all(specifiers)
+        candidates = [item for item in available_versions if item.ordinal in intervals and item not in incompatibilities]
 
         criterion = Criterion(
             candidates=candidates,
@@ -170,9 +216,13 @@ class Resolution(object):
 
     
 
-    @staticmethod
-    def _is_satisfied_by(requirement, candidate):
-        if candidate.version not in requirement.specifier or not requirement.extra.issubset(candidate.extra):
+    def _is_satisfied_by(self, requirement, candidate):
+        if candidate.ordinal is not None and candidate.name in self.version_spaces:
+            in_specifier = candidate.ordinal in self.version_spaces[candidate.name].compile(requirement.specifier)
+        else:
+            in_specifier = candidate.version in requirement.specifier
+
+        if not in_specifier or not requirement.extra.issubset(candidate.extra):
             # do not satify the specifier or do not contain all extra
             return False
         
@@ -264,9 +314,7 @@ class Resolution(object):
     
 
     def _get_dependencies(self, candidate, req_extra):
-        with self.querier.driver.session(default_access_mode=neo4j.READ_ACCESS) as session:
-            req_list = session.read_transaction(self.querier.get_requirements4version, candidate.name, candidate.str_version)
-        req_list.sort(key=lambda x:x[1]['order'])
+        req_list = self._read_requirements(candidate.name, candidate.str_version)
 
         ret = []
 
@@ -343,6 +391,7 @@ class Resolution(object):
 
             req_extra = criterion.get_req_extra()
             selected_candidate = Candidate(candidate.name, candidate.version, req_extra)
+            selected_candidate.ordinal = candidate.ordinal
             # Check the newly-pinned candidate actually works. This should
             # always pass under normal circumstances, but in the case of a
             # faulty provider, we will raise an error to notify the implementer
@@ -599,18 +648,36 @@ class Resolution(object):
 
     
 
-    def main(self, requirements, python_version, extra_deps, deadline=None, max_rounds=10000):
+    def main(self, requirements, python_version, extra_deps, deadline=None, max_rounds=10000, timeout=300):
         # Register the signal function handler
         signal.signal(signal.SIGALRM, handle_timeout)
-        signal.alarm(300)
+        end_time = time.time() + timeout
 
         ret = None
         try:
-            self.resolve(requirements, python_version, deadline, max_rounds)
+            i = 0
+            window_num = len(self.version_windows)
+            while i < window_num:
+                self.version_window = self.version_windows[i]
+                # each window has its share of the remaining time, the last one (all versions) has the rest
+                signal.alarm(max(1, math.ceil((end_time - time.time()) / (window_num - i))))
+                try:
+                    self.resolve(requirements, python_version, deadline, max_rounds)
+                except ResolutionTooDeep:
+                    # not solved by narrowing: all versions directly
+                    i = max(i + 1, window_num - 1)
+                    continue
+                except (ResolutionError, ResolverTimeoutException):
+                    # widen the candidate versions
+                    i += 1
+                    continue
+                finally:
+                    signal.alarm(0)
+                
+                ret = self.generate_install_pairs(extra_deps)
+                break
         except ResolverException as e:
-            signal.alarm(0)
-        else:
-            signal.alarm(0)
-            ret = self.generate_install_pairs(extra_deps)
+            pass
         finally:
+            signal.alarm(0)
             return ret
\ No newline at end of file
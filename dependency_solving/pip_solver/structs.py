@@ -1,5 +1,5 @@
 import collections
-from packaging.version import parse
+from utils.version_table import version_table
 from packaging.specifiers import SpecifierSet
 from packaging.utils import canonicalize_name
 
@@ -20,7 +20,8 @@ RequirementInformation = collections.namedtuple(
 class Requirement(object):
     def __init__(self, name, specifier='', extra=None):
         '''
-        name, specifier: str
+        name: str
+        specifier: str, SpecifierSet or VersionSet (the explicit versions)
         extra: Set
         '''
         self.name = canonicalize_name(name)
@@ -58,7 +59,7 @@ class Candidate(object):
 
         if isinstance(version, str):
             self.str_version = version
-            self.version = parse(version)
+            self.version = version_table.parse(version)
         else:
             self.str_version = str(version)
             self.version = version
@@ -69,6 +70,8 @@ class Candidate(object):
             self.extra = set()
         
         self.installed = False
+        # the index in the available versions of the package (see Resolution._get_available_versions)
+        self.ordinal = None
     
 
     def __repr__(self):
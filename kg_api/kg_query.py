@@ -47,6 +47,12 @@ class QueryApplication(object):
         return ret
 
 
+    @staticmethod
+    def count_versions(tx):
+        result = tx.run("MATCH (v:Version) RETURN COUNT(v);")
+        return result.single()[0]
+
+
     @staticmethod
     def get_standard_modules_by_module(tx, top_module, module_list, max_hop, ret_info):
         result = tx.run("MATCH (r:Release)-[:has_module]->(m:Module {name:$top_module})-[:has_module*0..%d]\
@@ -184,6 +190,25 @@ class QueryApplication(object):
         return package, [version, rel_obj['specifier'], rel_obj['repos_spec']]
     
 
+    @staticmethod
+    def get_module_versions_by_packages(tx, package_list, module_list):
+        result = tx.run("MATCH (p:Package)-[:has_version]->(v:Version {removal:FALSE})-[:has_module]->(m:Module) "
+                        "WHERE p.name in $package_list AND m.name in $module_list "
+                        "MATCH (v)-[r:requires_lang]->() "
+                        "RETURN m.name, p.name, v.version, r;", package_list=package_list, module_list=module_list)
+        
+        ret = {}
+        for record in result:
+            module, package, version, rel_obj = record
+            if module not in ret:
+                ret[module] = {}
+            if package not in ret[module]:
+                ret[module][package] = []
+            ret[module][package].append([version, rel_obj['specifier'], rel_obj['repos_spec']])
+
+        return ret
+    
+
     @staticmethod
     def get_versions_lang_by_package(tx, package):
         result = tx.run("MATCH (:Package {name:$package})-[:has_version]->(v:Version {removal:FALSE})-[r:requires_lang]->() "
@@ -197,6 +222,22 @@ class QueryApplication(object):
         return ret
     
 
+    @staticmethod
+    def get_versions_lang_by_packages(tx, package_list):
+        result = tx.run("MATCH (p:Package)-[:has_version]->(v:Version {removal:FALSE})-[r:requires_lang]->() "
+                        "WHERE p.name in $package_list "
+                        "RETURN p.name, v.version, r;", package_list=package_list)
+        
+        ret = {}
+        for record in result:
+            package, version, rel_obj = record
+            if package not in ret:
+                ret[package] = []
+            ret[package].append([version, rel_obj['specifier'], rel_obj['repos_spec']])
+
+        return ret
+    
+
     @staticmethod
     def get_versions_by_package(tx, package):
         result = tx.run("MATCH (p:Package {name:$package})-[:has_version]->(v:Version {removal:FALSE}) "
@@ -1,35 +1,40 @@
 import time
 import sys
+import hashlib
 import neo4j
-from packaging.specifiers import SpecifierSet
-from packaging.version import parse
 from packaging.utils import canonicalize_name
 
 sys.path.append("..")
 from kg_api.kg_query import QueryApplication
-from utils.calculator import calculate_matching_degree
-from utils.handle_unknown import get_similar_packages
+from utils.calculator import MatchingKernel
+from utils.handle_unknown import get_similar_packages, SimilarityCache
+from utils.bounded_cache import BoundedCache, get_size
+from utils.symbol_table import symbol_table
+from utils.specifier_engine import specifier_engine, VersionSpace
+from utils.version_table import version_table, PYTHON_RELEASES
+from utils.variables import SIM_INDEX, SIM_INDEX_FILE, SIM_CACHE_BYTES, SIM_CACHE_FILE, DISCOVERY_CACHE_BYTES
 
 # from utils.calculator import NoneSimilarity as RatioCalculator
-from utils.calculator import NamingSimilarity as RatioCalculator                                         
+# from utils.calculator import NamingSimilarity as RatioCalculator
+from utils.calculator import BatchNamingSimilarity as RatioCalculator
 
 
 def _get_leaves(node_set):
-    # Get leaf nodes of the parse tree
-    sorted_node = sorted(node_set, key=lambda x:len(x.split('.')))
-    length = len(sorted_node)
-
-    del_index = []
-    for i in range(length):
-        for j in range(i+1, length):
-            if sorted_node[j].startswith(sorted_node[i]+'.'):
-                del_index.append(i)
-                break
-    
-    for index in reversed(del_index):
-        sorted_node.pop(index)
-    
-    return sorted_node
+    # Get leaf nodes of the parse tree: the names that are not prefixes of others
+    prefix_ids = set()
+    for item in node_set:
+        sid = symbol_table.parents[symbol_table.intern(item)]
+        while sid >= 0 and sid not in prefix_ids:
+            prefix_ids.add(sid)
+            sid = symbol_table.parents[sid]
+
+    leaves = [item for item in node_set if symbol_table.intern(item) not in prefix_ids]
+    return sorted(leaves, key=lambda x:symbol_table.get_depth(symbol_table.intern(x)))
+
+
+def _copy_candidates(pv_info):
+    # {pkg: [[version, spec, repos_spec, matching_degree], ]} are modified by the environment generation
+    return {pkg: [list(x) for x in v_list] for pkg, v_list in pv_info.items()}
 
 
 class DiscoveryApplication(object):
@@ -40,15 +45,105 @@ class DiscoveryApplication(object):
 
         with self.kg_querier.driver.session(default_access_mode=neo4j.READ_ACCESS) as session:
             self.release_list = session.read_transaction(QueryApplication.get_all_releases)
+        self.release_space = VersionSpace(self.release_list)
         
         self.calculator = None
+
+        # the KG results of the current inference, reused by the adjustments
+        self.memo = None
+        self.clear_memo()
+
+        # the results of programs in batch runs, by the fingerprints of their imports
+        self.cache = BoundedCache(DISCOVERY_CACHE_BYTES) if DISCOVERY_CACHE_BYTES > 0 else None
+    
+
+    def clear_memo(self):
+        self.memo = {
+            'standard_modules': {},     # {top_module: (set(queried module), {release: {mid: [module]}})}
+            'third_modules': {},        # {top_module: (set(queried module), {mid: [module]})}
+            'queries': {},              # {(query, args): result} for attribute sets and package versions
+        }
+    
+
+    def _read_query(self, session, query, *args):
+        # the results are shared by the callers, they should not be modified
+        key = (query.__name__, ) + tuple(frozenset(x) if isinstance(x, list) else x for x in args)
+        query_memo = self.memo['queries']
+        if key not in query_memo:
+            query_memo[key] = session.read_transaction(query, *args)
+        
+        return query_memo[key]
+    
+
+    def _get_new_modules(self, module_memo, top_module, module_list):
+        # only the modules not queried in this inference
+        if top_module not in module_memo:
+            module_memo[top_module] = (set(), {})
+        queried_modules, tree_info = module_memo[top_module]
+
+        new_modules = [x for x in module_list if x not in queried_modules]
+        queried_modules.update(new_modules)
+        if len(new_modules) == 0:
+            return new_modules, 0, tree_info
+        
+        # longest module, e.g. numpy.linalg.info, has_module*0..2
+        max_hop = max([symbol_table.get_depth(symbol_table.intern(item)) for item in new_modules]) - 1
+        return new_modules, max_hop, tree_info
+    
+
+    def get_standard_modules(self, session, top_module, module_list, ret_info):
+        '''
+        same as QueryApplication.get_standard_modules_by_module, the queried modules are memorized
+        '''
+        new_modules, max_hop, tree_info = self._get_new_modules(self.memo['standard_modules'], top_module, module_list)
+        if new_modules:
+            session.read_transaction(QueryApplication.get_standard_modules_by_module, top_module, new_modules, max_hop, tree_info)
+        
+        module_set = set(module_list)
+        for release, module_info in tree_info.items():
+            for mid, modules in module_info.items():
+                modules = [x for x in modules if x in module_set]
+                if modules:
+                    if release not in ret_info:
+                        ret_info[release] = {}
+                    ret_info[release][mid] = modules
+    
+
+    def get_third_modules(self, session, top_module, module_list):
+        '''
+        same as QueryApplication.get_third_modules_by_module, the queried modules are memorized
+        '''
+        new_modules, max_hop, tree_info = self._get_new_modules(self.memo['third_modules'], top_module, module_list)
+        if new_modules:
+            result = session.read_transaction(QueryApplication.get_third_modules_by_module, top_module, new_modules, max_hop)
+            for mid, modules in result.items():
+                if mid not in tree_info:
+                    tree_info[mid] = []
+                tree_info[mid].extend(modules)
+        
+        module_set = set(module_list)
+        ret = {}
+        for mid, modules in tree_info.items():
+            modules = [x for x in modules if x in module_set]
+            if modules:
+                ret[mid] = modules
+        
+        return ret
     
 
     def load_all_pks(self):
         with self.kg_querier.driver.session(default_access_mode=neo4j.READ_ACCESS) as session:
             pkg_collections = session.read_transaction(QueryApplication.get_all_packages)
+            version_num = session.read_transaction(QueryApplication.count_versions)
 
         self.calculator = RatioCalculator(pkg_collections)
+        if SIM_INDEX:
+            self.calculator.load_index(SIM_INDEX_FILE)
+        # the cache is invalid if the KG is changed
+        # all versions of similar packages: unlike the dependencies of the resolution, they are never widened
+        kg_signature = hashlib.sha1('{}\n{}'.format(version_num, '\n'.join(pkg_collections)).encode('utf-8')).hexdigest()
+        self.calculator.cache = SimilarityCache(SIM_CACHE_BYTES, SIM_CACHE_FILE, kg_signature)
+
         return self.calculator
     
 
@@ -67,23 +162,20 @@ class DiscoveryApplication(object):
         min_module_dict = {}    # {top_module: int} Shortest module
         module_query_dict = {}  # {top_module: set(module prefix)}
         for item in imported_modules:
-            split_item = item.split('.')
-            top_module = split_item[0]
+            sid = symbol_table.intern(item)
+            top_module = symbol_table.get_top(sid)
             if top_module not in module_forest:
                 module_forest[top_module] = []
                 module_query_dict[top_module] = set()
             module_forest[top_module].append(item)
 
-            split_length = len(split_item)
+            split_length = symbol_table.get_depth(sid)
             if top_module not in min_module_dict or split_length < min_module_dict[top_module]:
                 min_module_dict[top_module] = split_length
 
             # split modules to module_set
-            tmp = top_module
-            module_query_dict[top_module].add(tmp)
-            for i in range(1, split_length):
-                tmp += '.' + split_item[i]
-                module_query_dict[top_module].add(tmp)
+            for prefix_id in symbol_table.get_prefixes(sid):
+                module_query_dict[top_module].add(symbol_table.get_name(prefix_id))
         
         # save the longest items
         for key, value in module_forest.items():
@@ -93,8 +185,8 @@ class DiscoveryApplication(object):
         attr_forest = {}    # {top_module: [attrs, ]}
         attr_query_dict = {}    # {top_module: [set(module, ), set(name, )]} possible modules and names
         for item in imported_resources.union(imported_attrs):
-            split_item = item.split('.')
-            top_module = split_item[0]
+            sid = symbol_table.intern(item)
+            top_module = symbol_table.get_top(sid)
             if top_module not in attr_forest:
                 attr_forest[top_module] = []
             attr_forest[top_module].append(item)
@@ -103,12 +195,13 @@ class DiscoveryApplication(object):
             if top_module not in attr_query_dict:
                 attr_query_dict[top_module] = [set(), set()]
 
+            # the prefixes from the shortest imported module
             module_length = min_module_dict[top_module]
-            tmp = '.'.join(split_item[:module_length])
-            attr_query_dict[top_module][0].add(tmp)
+            split_item = symbol_table.segments[sid]
+            prefix_ids = symbol_table.get_prefixes(sid)
+            attr_query_dict[top_module][0].add(symbol_table.get_name(prefix_ids[min(module_length, len(prefix_ids))-1]))
             for i in range(module_length, len(split_item)):
-                tmp += '.' + split_item[i]
-                attr_query_dict[top_module][0].add(tmp)
+                attr_query_dict[top_module][0].add(symbol_table.get_name(prefix_ids[i]))
                 attr_query_dict[top_module][1].add(split_item[i])
         
         # save the longest attrs
@@ -118,33 +211,38 @@ class DiscoveryApplication(object):
         return module_forest, module_query_dict, attr_forest, attr_query_dict
     
 
-    def python_discovery(self, parse_info):
+    def python_discovery(self, parse_info, import_only=False):
 
         module_forest, module_query_dict, attr_forest, attr_query_dict = self.generate_forest_info(parse_info)
+        if import_only:
+            # no attribute queries and matching: the candidate releases are ranked by versions
+            attr_forest, attr_query_dict = {}, {}
         
         # Step 1: For imported modules
         
         python_module_info = {} # {release: {top_module id: [module]}}
         if module_forest:
             with self.kg_querier.driver.session(default_access_mode=neo4j.READ_ACCESS) as session:
-                for key, value in module_forest.items():
-                    session.read_transaction(QueryApplication.get_standard_modules_by_module, key, list(module_query_dict[key]), len(value[-1].split('.'))-1, python_module_info)
+                for key in module_forest:
+                    self.get_standard_modules(session, key, list(module_query_dict[key]), python_module_info)
         else:
             python_module_info = {k: {} for k in self.release_list}
 
         # satify the Python syntax
         python_sytax = parse_info.get('python_syntax', set())
         if len(python_sytax) > 0:
-            spec = SpecifierSet('')
-            for item in python_sytax:
-                spec &= item
-            python_module_info = {k: v for k,v in python_module_info.items() if k in spec}
+            release_space = self.release_space
+            if any(k not in release_space.ordinals for k in python_module_info):
+                release_space = VersionSpace(list(python_module_info))
+            avail_releases = release_space.compile_all(python_sytax)
+            python_module_info = {k: v for k,v in python_module_info.items() if release_space.ordinals[k] in avail_releases}
 
         if len(python_module_info) == 0:
             # no available Python releases
             return {}
 
         # Calculate the matching degree
+        module_kernels = {k: MatchingKernel(v) for k, v in module_forest.items()}
         release_module_mapping = {}     # record the id of top module in the release: {release: {top_module: mid}}
         release_score = {}
         for release, module_info in python_module_info.items():
@@ -154,7 +252,7 @@ class DiscoveryApplication(object):
                 if spanning_tree:
                     top_module = spanning_tree[0].split('.')[0]
                     release_module_mapping[release][top_module] = mid
-                    release_score[release] += calculate_matching_degree(spanning_tree, module_forest[top_module])
+                    release_score[release] += module_kernels[top_module].score(spanning_tree)
         
         candidate_releases = self.get_top_candidates(release_score)
 
@@ -177,17 +275,18 @@ class DiscoveryApplication(object):
                     
                     mid = release_module_mapping[release][key]
                     # longest module, e.g. numpy.linalg.info, has_module*0..2
-                    max_hop = max([len(item.split('.')) for item in module_value]) - 1
+                    max_hop = max([symbol_table.get_depth(symbol_table.intern(item)) for item in module_value]) - 1
 
                     # query all submodules and their ids
-                    submodule_dict = session.read_transaction(QueryApplication.get_submodules_by_module_id, mid, list(module_value), max_hop)
+                    submodule_dict = self._read_query(session, QueryApplication.get_submodules_by_module_id, mid, list(module_value), max_hop)
                     
                     # query attrs for all submodules
-                    attr_info = session.read_transaction(QueryApplication.get_attr_by_module_id_list, list(submodule_dict), list(name_value))
+                    attr_info = self._read_query(session, QueryApplication.get_attr_by_module_id_list, list(submodule_dict), list(name_value))
                     
                     python_attr_info[release][mid] = set(submodule_dict.values()) | attr_info
 
         # Calculate the matching degree
+        attr_kernels = {k: MatchingKernel(v) for k, v in attr_forest.items()}
         standard_attr_score = {}
         for release in python_attr_info:
             standard_attr_score[release] = 0.0
@@ -197,7 +296,7 @@ class DiscoveryApplication(object):
 
                 mid = release_module_mapping[release][top_module]
                 spanning_tree = python_attr_info[release][mid]
-                standard_attr_score[release] += calculate_matching_degree(spanning_tree, attr_forest[top_module])
+                standard_attr_score[release] += attr_kernels[top_module].score(spanning_tree)
 
         # Step 3: built-in functions
         builtin_attr_score = {}
@@ -208,15 +307,16 @@ class DiscoveryApplication(object):
             top_attrs = set()
             name_set = set()
             for item in leaf_attr:
-                split_item = item.split('.')
+                split_item = symbol_table.segments[symbol_table.intern(item)]
                 top_attrs.add(split_item[0])
                 for i in range(1, len(split_item)):
                     name_set.add(split_item[i])
             
+            builtin_kernel = MatchingKernel(leaf_attr)
             with self.kg_querier.driver.session(default_access_mode=neo4j.READ_ACCESS) as session:
                 for release in python_attr_info:
-                    spanning_tree = session.read_transaction(QueryApplication._get_attributes_by_release_and_seed, release, list(top_attrs), list(name_set))
-                    builtin_attr_score[release] = calculate_matching_degree(spanning_tree, leaf_attr)
+                    spanning_tree = self._read_query(session, QueryApplication._get_attributes_by_release_and_seed, release, list(top_attrs), list(name_set))
+                    builtin_attr_score[release] = builtin_kernel.score(spanning_tree)
 
         # Sum: imported attrs and built-in functions
         release_score = {x: standard_attr_score.get(x, 0.0)+builtin_attr_score.get(x, 0.0) for x in candidate_releases}
@@ -224,23 +324,38 @@ class DiscoveryApplication(object):
         return release_score
     
 
-    def python_whole_steps(self, parse_info):
-        release_score = self.python_discovery(parse_info)
+    def python_whole_steps(self, parse_info, import_only=False):
+        # the standard imports, built-in attributes and syntax constraints
+        fingerprint = ('python', import_only) + tuple(sorted((k, frozenset(v)) for k, v in parse_info.items()))
+        if self.cache is not None:
+            cache_res = self.cache.get(fingerprint)
+            if cache_res is not None:
+                return list(cache_res)
+
+        release_score = self.python_discovery(parse_info, import_only)
         
         # sort by matching degree, then by version
-        candidate_releases = sorted(release_score, key=lambda x: (release_score[x], parse(x)), reverse=True)
+        release_ranks = version_table.get_ranks(PYTHON_RELEASES, release_score)
+        candidate_releases = sorted(release_score, key=lambda x: (release_score[x], release_ranks[x]), reverse=True)
         # candidate_releases = self.get_top_candidates(release_score)
 
+        if self.cache is not None:
+            # the fingerprints of the imports are as large as the results
+            self.cache.put(fingerprint, list(candidate_releases), get_size((fingerprint, candidate_releases)))
+
         return candidate_releases
     
 
-    def third_discovery(self, parse_info):
+    def third_discovery(self, parse_info, import_only=False):
         module_forest, module_query_dict, attr_forest, attr_query_dict = self.generate_forest_info(parse_info)
+        if import_only:
+            # no attribute queries and matching: the matching degrees of versions are 0.0
+            attr_forest, attr_query_dict = {}, {}
 
         module_info = {}
         with self.kg_querier.driver.session(default_access_mode=neo4j.READ_ACCESS) as session:
-            for key, value in module_forest.items():
-                module_info[key] = session.read_transaction(QueryApplication.get_third_modules_by_module, key, list(module_query_dict[key]), len(value[-1].split('.'))-1)
+            for key in module_forest:
+                module_info[key] = self.get_third_modules(session, key, list(module_query_dict[key]))
 
         # Calculate the matching degree
         candidate_top_modules = {}  # {top_module: [mid, ]}
@@ -251,9 +366,10 @@ class DiscoveryApplication(object):
                 unknown_modules.append(top_module)
                 continue
 
+            module_kernel = MatchingKernel(module_forest[top_module])
             module_score = {}
             for mid, spanning_tree in forest.items():
-                module_score[mid] = calculate_matching_degree(spanning_tree, module_forest[top_module])
+                module_score[mid] = module_kernel.score(spanning_tree)
 
             candidate_top_modules[top_module] = self.get_top_candidates(module_score)
 
@@ -270,17 +386,17 @@ class DiscoveryApplication(object):
 
                 module_value, name_value = value
                 
-                max_hop = max([len(item.split('.')) for item in module_value]) - 1
+                max_hop = max([symbol_table.get_depth(symbol_table.intern(item)) for item in module_value]) - 1
 
                 # submodules 
-                submodule_dict = session.read_transaction(QueryApplication.get_submodules_by_module_list, candidate_mids, list(module_value), max_hop)
+                submodule_dict = self._read_query(session, QueryApplication.get_submodules_by_module_list, candidate_mids, list(module_value), max_hop)
                 
                 # all submodule ids
                 mid_list = []
                 for module_tuple in submodule_dict.values():
                     mid_list.extend(module_tuple[0])
                 
-                attr_info = session.read_transaction(QueryApplication.get_attr_by_muilti_mid_list, list(set(mid_list)), list(name_value))
+                attr_info = self._read_query(session, QueryApplication.get_attr_by_muilti_mid_list, list(set(mid_list)), list(name_value))
                 
                 for mid in candidate_mids:
                     tmp = []
@@ -301,19 +417,20 @@ class DiscoveryApplication(object):
         pkg_module_dict = {}
         with self.kg_querier.driver.session(default_access_mode=neo4j.READ_ACCESS) as session:
             for top_module, mid_list in candidate_top_modules.items():
+                attr_kernel = MatchingKernel(attr_forest[top_module]) if top_module in attr_forest else None
                 # {pkg: [(version_obj, spec, repos_spec, matching_degree), ]}
                 pv_tmp = {}
                 similarity_tmp = {}
 
                 cname = canonicalize_name(top_module)
                 for mid in mid_list:
-                    if top_module in attr_forest:
-                        matching_degree = calculate_matching_degree(third_attr_info[mid], attr_forest[top_module])
+                    if attr_kernel is not None:
+                        matching_degree = attr_kernel.score(third_attr_info[mid])
                     else:
                         matching_degree = 0.0
 
-                    pkg, v_info = session.read_transaction(QueryApplication.get_packages_and_versions_by_module, mid)
-                    v_info.append(matching_degree)
+                    pkg, v_info = self._read_query(session, QueryApplication.get_packages_and_versions_by_module, mid)
+                    v_info = v_info + [matching_degree, ]
 
                     if pkg not in pv_tmp:
                         pv_tmp[pkg] = []
@@ -326,8 +443,9 @@ class DiscoveryApplication(object):
                     pv_tmp[pkg].append(v_info)
                 
                 # sort versions by matching_degree, then by version
-                for v_info in pv_tmp.values():
-                    v_info.sort(key=lambda x:(x[-1], parse(x[0])), reverse=True)
+                for pkg, v_info in pv_tmp.items():
+                    version_ranks = version_table.get_ranks(pkg, [x[0] for x in v_info])
+                    v_info.sort(key=lambda x:(x[-1], version_ranks[x[0]]), reverse=True)
 
                 candidate_pvs[top_module] = pv_tmp
                 pkg_module_dict[top_module] = similarity_tmp
@@ -335,8 +453,117 @@ class DiscoveryApplication(object):
         return candidate_pvs, pkg_module_dict, unknown_modules
     
 
-    def third_whole_steps(self, parse_info):
-        candidate_pvs, pkg_module_dict, unknown_modules = self.third_discovery(parse_info)
+    def split_by_top_module(self, parse_info):
+        '''
+        {top_module: parse info}, in the order of the imported modules
+        '''
+        ret = {}
+        for key in ['imported_module', 'imported_resource', 'imported_attr']:
+            for item in parse_info.get(key, set()):
+                top_module = symbol_table.get_top(symbol_table.intern(item))
+                if top_module not in ret:
+                    ret[top_module] = {'imported_module': set(), 'imported_resource': set(), 'imported_attr': set()}
+                ret[top_module][key].add(item)
+        
+        return ret
+    
+
+    def get_third_fingerprint(self, top_module, parse_info, import_only=False):
+        if import_only:
+            # only the modules are matched
+            return ('third', top_module, True, frozenset(parse_info['imported_module']))
+        
+        return ('third', top_module, False, frozenset(parse_info['imported_module']),\
+                frozenset(parse_info['imported_resource']), frozenset(parse_info['imported_attr']))
+    
+
+    def third_cached_discovery(self, parse_info, import_only=False):
+        '''
+        third_discovery with the cached results of each top module, the other top modules are discovered together
+        '''
+        if self.cache is None:
+            return self.third_discovery(parse_info, import_only)
+        
+        # {top_module: (pv_info, similarity_info, is_unknown)}
+        top_results = {}
+        new_fingerprints = {}
+        new_info = {'imported_module': set(), 'imported_resource': set(), 'imported_attr': set()}
+        top_infos = self.split_by_top_module(parse_info)
+        for top_module, top_info in top_infos.items():
+            fingerprint = self.get_third_fingerprint(top_module, top_info, import_only)
+            cache_res = self.cache.get(fingerprint)
+            if cache_res is not None:
+                top_results[top_module] = cache_res
+            else:
+                new_fingerprints[top_module] = fingerprint
+                for key, value in top_info.items():
+                    new_info[key].update(value)
+        
+        if new_fingerprints:
+            new_pvs, new_pkg_module_dict, new_unknown_modules = self.third_discovery(new_info, import_only)
+            for top_module, fingerprint in new_fingerprints.items():
+                if top_module in new_pvs:
+                    top_res = (_copy_candidates(new_pvs[top_module]), dict(new_pkg_module_dict[top_module]), False)
+                else:
+                    top_res = (None, None, top_module in new_unknown_modules)
+
+                self.cache.put(fingerprint, top_res, get_size((fingerprint, top_res)))
+                top_results[top_module] = top_res
+        
+        candidate_pvs = {}
+        pkg_module_dict = {}
+        unknown_modules = []
+        for top_module in top_infos:
+            pv_info, similarity_info, is_unknown = top_results[top_module]
+            if pv_info is not None:
+                candidate_pvs[top_module] = _copy_candidates(pv_info)
+                pkg_module_dict[top_module] = dict(similarity_info)
+            elif is_unknown:
+                unknown_modules.append(top_module)
+
+        return candidate_pvs, pkg_module_dict, unknown_modules
+    
+
+    def seed_discovery(self, parse_info, requirements):
+        '''
+        the candidates of the top modules provided by the declared packages {pkg: specifier} of the project,
+        and the parse info of the other top modules for the discovery
+        '''
+        candidate_pvs = {}      # {top module: {pkg: [(version, spec, repos_spec, matching_degree), ]}}
+        pkg_module_dict = {}    # {top_module: {pkg: similarity}}
+
+        top_infos = self.split_by_top_module(parse_info)
+        if len(top_infos) == 0 or len(requirements) == 0:
+            return candidate_pvs, pkg_module_dict, parse_info
+        
+        with self.kg_querier.driver.session(default_access_mode=neo4j.READ_ACCESS) as session:
+            module_info = session.read_transaction(QueryApplication.get_module_versions_by_packages, list(requirements), list(top_infos))
+
+        for top_module, pv_info in module_info.items():
+            pv_tmp = {}
+            for pkg, v_list in pv_info.items():
+                # the declared versions
+                spec = specifier_engine.get_specifier(requirements[pkg])
+                v_list = [x + [1.0, ] for x in v_list if x[0] in spec]
+                if len(v_list) > 0:
+                    version_table.sort(pkg, v_list, key=lambda x:x[0], reverse=True)
+                    pv_tmp[pkg] = v_list
+            
+            if len(pv_tmp) > 0:
+                candidate_pvs[top_module] = pv_tmp
+                pkg_module_dict[top_module] = {pkg: 1.0 for pkg in pv_tmp}
+        
+        rest_info = {'imported_module': set(), 'imported_resource': set(), 'imported_attr': set()}
+        for top_module, top_info in top_infos.items():
+            if top_module not in candidate_pvs:
+                for key, value in top_info.items():
+                    rest_info[key].update(value)
+
+        return candidate_pvs, pkg_module_dict, rest_info
+    
+
+    def third_whole_steps(self, parse_info, import_only=False):
+        candidate_pvs, pkg_module_dict, unknown_modules = self.third_cached_discovery(parse_info, import_only)
 
         # For unknown modules
         unknown_candidate_pvs, unknown_pkg_module_dict = get_similar_packages(self.kg_querier, self.calculator, unknown_modules)
@@ -348,8 +575,19 @@ class DiscoveryApplication(object):
 
     
 
-    def discover(self, python_parse_info, third_parse_info):
-        candidate_releases = self.python_whole_steps(python_parse_info)
-        third_candidates = self.third_whole_steps(third_parse_info)
+    def discover(self, python_parse_info, third_parse_info, import_only=False, requirements=None):
+        '''
+        import_only: the candidates are matched by the imported modules only (faster, lower fidelity)
+        requirements: {pkg: specifier} declared by the project, the top modules provided by them are not discovered
+        '''
+        seeded_pvs, seeded_pkg_module_dict = {}, {}
+        if requirements:
+            seeded_pvs, seeded_pkg_module_dict, third_parse_info = self.seed_discovery(third_parse_info, requirements)
+
+        candidate_releases = self.python_whole_steps(python_parse_info, import_only)
+        third_candidates = self.third_whole_steps(third_parse_info, import_only)
+
+        third_candidates[0].update(seeded_pvs)
+        third_candidates[1].update(seeded_pkg_module_dict)
 
         return candidate_releases, third_candidates
\ No newline at end of file
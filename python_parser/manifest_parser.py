@@ -0,0 +1,181 @@
+import os
+import re
+import ast
+from packaging.requirements import Requirement, InvalidRequirement
+from packaging.utils import canonicalize_name
+
+
+# the manifests in the root of a project
+REQUIREMENTS_FILE = 'requirements.txt'
+SETUP_FILE = 'setup.py'
+PIPFILE = 'Pipfile'
+
+pipfile_section_pattern = re.compile(r'^\s*\[(.+?)\]\s*$')
+pipfile_item_pattern = re.compile(r'^\s*["\']?([A-Za-z0-9._-]+)["\']?\s*=\s*(.+?)\s*$')
+pipfile_version_pattern = re.compile(r'version\s*=\s*["\'](.*?)["\']')
+quoted_pattern = re.compile(r'["\'](.*?)["\']')
+install_requires_pattern = re.compile(r'install_requires\s*=\s*\[(.*?)\]', re.S)
+
+
+def _read_lines(fpath):
+    try:
+        with open(fpath, 'r', errors='ignore') as f:
+            return f.readlines()
+    except OSError:
+        return []
+
+
+def _add_requirement(ret, req_str):
+    # {pkg: specifier}, the specifiers of the same package are intersected
+    try:
+        req = Requirement(req_str.strip())
+    except InvalidRequirement:
+        return
+
+    if req.url:
+        # installed from the url
+        return
+
+    if req.marker is not None:
+        # the environment of the markers (python_version, sys_platform, ...) is not known before the inference
+        return
+
+    pkg = canonicalize_name(req.name)
+    specifier = str(req.specifier)
+    if pkg not in ret or len(ret[pkg]) == 0:
+        ret[pkg] = specifier
+    elif len(specifier) > 0:
+        ret[pkg] = '{},{}'.format(ret[pkg], specifier)
+
+
+def parse_requirements_file(fpath, ret, visited=None):
+    if visited is None:
+        visited = set()
+
+    fpath = os.path.realpath(fpath)
+    if fpath in visited:
+        return
+    visited.add(fpath)
+
+    for line in _read_lines(fpath):
+        line = line.split(' #')[0].strip()
+        if len(line) == 0 or line.startswith('#'):
+            continue
+
+        if line.startswith('-r ') or line.startswith('--requirement '):
+            # included requirement files
+            include_path = line.split(None, 1)[1].strip()
+            parse_requirements_file(os.path.join(os.path.dirname(fpath), include_path), ret, visited)
+        elif not line.startswith('-'):
+            # the other options (-e, -i, --hash, ...) are not requirements
+            _add_requirement(ret, line)
+
+
+def _get_install_requires(tree):
+    # the list of install_requires in setup(...), or the list assigned to the name
+    assigned_lists = {}
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Assign) and isinstance(node.value, (ast.List, ast.Tuple)):
+            for target in node.targets:
+                if isinstance(target, ast.Name):
+                    assigned_lists[target.id] = node.value
+
+    for node in ast.walk(tree):
+        if not isinstance(node, ast.Call):
+            continue
+
+        for keyword in node.keywords:
+            if keyword.arg != 'install_requires':
+                continue
+
+            value = keyword.value
+            if isinstance(value, ast.Name):
+                value = assigned_lists.get(value.id, None)
+            if not isinstance(value, (ast.List, ast.Tuple)):
+                # computed (open('requirements.txt').read().splitlines(), REQS + [...], ...)
+                return []
+
+            try:
+                return list(ast.literal_eval(value))
+            except ValueError:
+                # not literal items
+                return [x.value for x in value.elts if isinstance(x, ast.Constant) and isinstance(x.value, str)]
+
+    return []
+
+
+def parse_setup_file(fpath, ret):
+    content = ''.join(_read_lines(fpath))
+    try:
+        req_list = _get_install_requires(ast.parse(content))
+    except (SyntaxError, ValueError):
+        # Python 2: the literal list of install_requires
+        req_list = []
+        match_obj = re.search(install_requires_pattern, content)
+        if match_obj is not None:
+            req_list = re.findall(quoted_pattern, match_obj.group(1))
+    except Exception:
+        # the seeds are best-effort: never fail the inference
+        req_list = []
+
+    for item in req_list:
+        if isinstance(item, str):
+            _add_requirement(ret, item)
+
+
+def parse_pipfile(fpath, ret):
+    section = None
+    for line in _read_lines(fpath):
+        match_obj = re.match(pipfile_section_pattern, line)
+        if match_obj is not None:
+            section = match_obj.group(1).strip()
+            continue
+
+        if section != 'packages':
+            # dev-packages, source, requires
+            continue
+
+        match_obj = re.match(pipfile_item_pattern, line)
+        if match_obj is None:
+            continue
+
+        pkg, value = match_obj.groups()
+        if value.startswith('{'):
+            # {version = ">=1.0", extras = [...]}, or the packages from the vcs
+            if 'markers' in value or 'sys_platform' in value or 'platform_system' in value or 'os_name' in value:
+                # the same as the requirements with markers
+                continue
+            version_obj = re.search(pipfile_version_pattern, value)
+            if version_obj is None:
+                if 'git' in value or 'path' in value or 'file' in value:
+                    continue
+                specifier = ''
+            else:
+                specifier = version_obj.group(1)
+        else:
+            specifier = value.strip('"\'')
+
+        if specifier == '*':
+            specifier = ''
+        _add_requirement(ret, pkg + specifier)
+
+
+def get_manifest_requirements(project_dir):
+    '''
+    {pkg: specifier} declared by requirements.txt, setup.py (install_requires) and Pipfile of the project
+    '''
+    ret = {}
+
+    fpath = os.path.join(project_dir, REQUIREMENTS_FILE)
+    if os.path.isfile(fpath):
+        parse_requirements_file(fpath, ret)
+
+    fpath = os.path.join(project_dir, SETUP_FILE)
+    if os.path.isfile(fpath):
+        parse_setup_file(fpath, ret)
+
+    fpath = os.path.join(project_dir, PIPFILE)
+    if os.path.isfile(fpath):
+        parse_pipfile(fpath, ret)
+
+    return ret
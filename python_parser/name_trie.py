@@ -0,0 +1,101 @@
+class NameTrie(object):
+    '''
+    trie of dotted names, a node is {component: child node} and the value of the name ending at it is stored under None
+    '''
+    def __init__(self, names=()):
+        self.root = {}
+        self.names = {}         # {name: value}
+
+        for name in names:
+            self.add(name)
+
+
+    def __len__(self):
+        return len(self.names)
+
+
+    def __contains__(self, name):
+        return name in self.names
+
+
+    def __repr__(self):
+        return repr(self.names)
+
+
+    def add(self, name, value=True):
+        node = self.root
+        for part in name.split('.'):
+            child = node.get(part)
+            if child is None:
+                child = node[part] = {}
+            node = child
+
+        node[None] = value
+        self.names[name] = value
+
+
+    def remove(self, name):
+        # the empty nodes are kept: they are not the ends of names
+        if name not in self.names:
+            return
+
+        node = self.root
+        for part in name.split('.'):
+            node = node[part]
+
+        del node[None]
+        del self.names[name]
+
+
+    def get(self, name, default=None):
+        return self.names.get(name, default)
+
+
+    def has_prefix_of(self, name):
+        '''
+        whether a name equals name or is a dotted prefix of it: item == key or item.startswith(key+'.')
+        '''
+        node = self.root
+        for part in name.split('.'):
+            node = node.get(part)
+            if node is None:
+                return False
+            if None in node:
+                return True
+
+        return False
+
+
+    def has_extension_of(self, name):
+        '''
+        whether name equals a name or is a dotted prefix of it: key == name or key.startswith(name+'.')
+        '''
+        node = self.root
+        for part in name.split('.'):
+            node = node.get(part)
+            if node is None:
+                return False
+
+        return True
+
+
+    def get_longest_prefix(self, name, excluded_names=None):
+        '''
+        the longest name that equals name or is a dotted prefix of it, aside from excluded_names
+        '''
+        longest_prefix = None
+
+        node = self.root
+        end = -1
+        for part in name.split('.'):
+            node = node.get(part)
+            if node is None:
+                break
+
+            end += len(part) + 1
+            if None in node:
+                prefix = name[:end]
+                if excluded_names is None or prefix not in excluded_names:
+                    longest_prefix = prefix
+
+        return longest_prefix
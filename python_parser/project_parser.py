@@ -1,7 +1,39 @@
 # File directory structure, import relationships
 from .pyfile_parse import PythonParser
+from .project_walker import ProjectWalker
+from .manifest_parser import get_manifest_requirements
+from multiprocessing import Pool
 import os
 import re
+import sys
+
+sys.path.append("..")
+from utils.symbol_table import symbol_table
+
+
+# the parser held by each worker process
+_worker_parser = None
+
+
+def _init_worker(languages_dir, builtin_funcs, cache_size, cache_dir, grammar_dir):
+    global _worker_parser
+    _worker_parser = PythonParser(languages_dir, builtin_funcs, cache_size, cache_dir, grammar_dir)
+
+
+def _merge_parse_info(parse_info, value):
+    if value:
+        for key in parse_info:
+            parse_info[key] |= value[key]
+
+
+def _parse_files(args):
+    # parse a chunk of files and merge their info
+    file_list, import_only = args
+    parse_info = {'imported_module': set(), 'imported_resource': set(), 'imported_attr': set(), 'builtin_attr': set(), 'python_syntax': set()}
+    for fpath in file_list:
+        _merge_parse_info(parse_info, _worker_parser.parse(fpath, import_only=import_only))
+    
+    return parse_info
 
 
 def _find_prefix_items(prefixes, src_list):
@@ -9,31 +41,64 @@ def _find_prefix_items(prefixes, src_list):
     if len(prefixes) == 0:
         return ret 
 
+    prefix_ids = symbol_table.intern_all(prefixes)
     for item in src_list:
         # is or startswith one prefix
-        if item in prefixes:
+        if symbol_table.has_prefix_in(symbol_table.intern(item), prefix_ids):
             ret.add(item)
-        else:
-            for prefix in prefixes:
-                if item.startswith(prefix+'.'):
-                    ret.add(item)
-                    break
     
     return ret
 
 
 class projectParser(object):
-    def __init__(self, languages_dir, standard_libs, builtin_funcs):
+    def __init__(self, languages_dir, standard_libs, builtin_funcs, process_num=0, chunk_size=16, cache_size=0, cache_dir=None,\
+                 ignore_patterns=None, max_file_size=0, max_file_num=0, grammar_dir=None, read_manifests=False, prune_patterns=None):
         self.standard_libs = standard_libs
-        self.pyfile_parser = PythonParser(languages_dir, builtin_funcs)
+        self.pyfile_parser = PythonParser(languages_dir, builtin_funcs, cache_size, cache_dir, grammar_dir)
         self.iden_pattern = re.compile(r'[^\w\-]')
+
+        # the budgets of parsed files: no limit if 0
+        self.walker = ProjectWalker(ignore_patterns, prune_patterns)
+        self.max_file_size = max_file_size
+        self.max_file_num = max_file_num
+        self.skipped_files = {'ignored': [], 'too_large': [], 'over_budget': []}    # in the last parsed project
+
+        # {pkg: specifier} of requirements.txt, setup.py and Pipfile in the last parsed project
+        self.read_manifests = read_manifests
+        self.requirements = {}
+
+        # parse the files of large projects in processes
+        self.languages_dir = languages_dir
+        self.builtin_funcs = builtin_funcs
+        self.process_num = process_num
+        self.chunk_size = chunk_size
+        self.cache_size = cache_size
+        self.cache_dir = cache_dir
+        self.grammar_dir = grammar_dir
+        self.process_pool = None
+    
+
+    def close(self):
+        if self.process_pool is not None:
+            self.process_pool.close()
+            self.process_pool.join()
+            self.process_pool = None
+    
+
+    def _parse_files_parallel(self, py_files, parse_info, import_only=False):
+        if self.process_pool is None:
+            self.process_pool = Pool(self.process_num, initializer=_init_worker, initargs=(self.languages_dir, self.builtin_funcs, self.cache_size, self.cache_dir, self.grammar_dir))
+        
+        chunks = [(py_files[i:i+self.chunk_size], import_only) for i in range(0, len(py_files), self.chunk_size)]
+        for value in self.process_pool.imap_unordered(_parse_files, chunks):
+            _merge_parse_info(parse_info, value)
     
 
     def _clear_relative_resources(self, info_dict, local_modules=None):
         # remove local modules
         module_dict = {}
         for module in info_dict['imported_module']:
-            top_module = module.split('.')[0]
+            top_module = symbol_table.get_top(symbol_table.intern(module))
             if top_module not in module_dict:
                 module_dict[top_module] = []
             module_dict[top_module].append(module)
@@ -54,7 +119,7 @@ class projectParser(object):
 
         for name_set in info_dict.values():
             for item in list(name_set):
-                top_module = item.split('.')[0]
+                top_module = symbol_table.get_top(symbol_table.intern(item))
                 if top_module in local_top_module:
                     # local modules
                     name_set.remove(item)
@@ -69,7 +134,7 @@ class projectParser(object):
 
         top_modules = set()
         for item in imported_modules:
-            tmp = item.split('.')[0]
+            tmp = symbol_table.get_top(symbol_table.intern(item))
             if len(tmp) > 0:
                 top_modules.add(tmp)
         
@@ -101,35 +166,46 @@ class projectParser(object):
         return ret
 
 
+    def _is_module_dir(self, name):
+        return re.search(self.iden_pattern, name) is None
+
+
     def _get_all_local_module_name(self, root_dir):
         # Get all Python files and local module names
-        dir_list = [root_dir,]
         py_files = []
         module_list = []
+        ignored_files = []
+        too_large_files = []
+        over_budget_files = []
 
         base_path = os.path.dirname(root_dir)
         index = len(base_path) + 1
-        while len(dir_list) > 0:
-            py_dir = dir_list.pop()
-            for item in os.listdir(py_dir):
-                fpath = os.path.join(py_dir, item)
-                if os.path.isdir(fpath):
-                    # dir
-                    if re.search(self.iden_pattern, item) is None:
-                        dir_list.append(fpath)
-                        module_list.append(self._get_module_name(fpath[index:]))
-
-                elif os.path.isfile(fpath):
-                    if fpath.endswith('.py') or fpath.endswith('.so'):
-                        # py file
-                        py_name = item[:-3]
-                        if re.search(self.iden_pattern, py_name) is None:
-                            if not py_name.startswith('__'):
-                                # a module
-                                module_list.append(self._get_module_name(fpath[index:], True))
-
-                            if fpath.endswith('.py'):
-                                py_files.append(fpath)
+        # the ignored files and directories are still local modules, only not parsed
+        for fpath, entry, is_ignored in self.walker.walk(root_dir, self._is_module_dir):
+            if entry.is_dir():
+                # dir
+                module_list.append(self._get_module_name(fpath[index:]))
+
+            elif fpath.endswith('.py') or fpath.endswith('.so'):
+                # py file
+                py_name = entry.name[:-3]
+                if re.search(self.iden_pattern, py_name) is None:
+                    if not py_name.startswith('__'):
+                        # a module
+                        module_list.append(self._get_module_name(fpath[index:], True))
+
+                    if fpath.endswith('.py'):
+                        if is_ignored:
+                            ignored_files.append(fpath)
+                        elif self.max_file_size > 0 and entry.stat().st_size > self.max_file_size:
+                            # generated files
+                            too_large_files.append(fpath)
+                        elif self.max_file_num > 0 and len(py_files) >= self.max_file_num:
+                            over_budget_files.append(fpath)
+                        else:
+                            py_files.append(fpath)
+
+        self.skipped_files = {'ignored': self.walker.ignored + ignored_files, 'too_large': too_large_files, 'over_budget': over_budget_files}
 
         # generate all partial module names
         ret = set()
@@ -146,32 +222,39 @@ class projectParser(object):
         return py_files, ret
     
 
-    def parse(self, source_code, not_file=False):
+    def parse(self, source_code, not_file=False, import_only=False):
+        '''
+        import_only: only the imports and syntax features are parsed, for the fast inference
+        '''
         project_path = os.path.abspath(source_code)
 
         parse_info = {'imported_module': set(), 'imported_resource': set(), 'imported_attr': set(), 'builtin_attr': set(), 'python_syntax': set()}
         local_modules = None
+        if not not_file:
+            # the snippets (validation adjustments) keep the skipped files and the requirements of the last project
+            self.skipped_files = {'ignored': [], 'too_large': [], 'over_budget': []}
+            self.requirements = {}
 
         if not_file:
             # only string
-            parse_info = self.pyfile_parser.parse(source_code, not_file)
+            parse_info = self.pyfile_parser.parse(source_code, not_file, import_only)
 
         elif os.path.isdir(project_path):
             # directory
+            if self.read_manifests:
+                self.requirements = get_manifest_requirements(project_path)
+
             py_files, local_modules = self._get_all_local_module_name(project_path)
-            parse_dict = {}
-            for fpath in py_files:
-                # all python files
-                parse_dict[fpath] = self.pyfile_parser.parse(fpath)
-            
-            for value in parse_dict.values():
-                if value:
-                    for key in parse_info:
-                        parse_info[key] |= value[key]
+            if self.process_num > 0 and len(py_files) > self.chunk_size:
+                self._parse_files_parallel(py_files, parse_info, import_only)
+            else:
+                for fpath in py_files:
+                    # all python files: merged at once, only one file is kept in memory
+                    _merge_parse_info(parse_info, self.pyfile_parser.parse(fpath, import_only=import_only))
 
         elif os.path.isfile(project_path) and project_path.endswith('.py'):
             # single Python file
-            parse_info = self.pyfile_parser.parse(project_path)
+            parse_info = self.pyfile_parser.parse(project_path, import_only=import_only)
         
         # split to Python-related and thir-related info
         python_parse_info, third_parse_info = self._split_parse_info(parse_info)
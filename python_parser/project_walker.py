@@ -0,0 +1,182 @@
+import os
+import re
+from collections import deque
+
+
+def _translate(pattern):
+    # .gitignore wildcards to a regular expression: '*' and '?' do not match '/'
+    ret = []
+    i = 0
+    length = len(pattern)
+    while i < length:
+        if pattern.startswith('**/', i):
+            ret.append('(?:.*/)?')
+            i += 3
+        elif pattern.startswith('**', i):
+            ret.append('.*')
+            i += 2
+        elif pattern[i] == '*':
+            ret.append('[^/]*')
+            i += 1
+        elif pattern[i] == '?':
+            ret.append('[^/]')
+            i += 1
+        elif pattern[i] == '[' and pattern.find(']', i+1) > 0:
+            end = pattern.find(']', i+1)
+            chars = pattern[i+1:end].replace('\\', '\\\\')
+            if chars.startswith('!'):
+                chars = '^' + chars[1:]
+            ret.append('[{}]'.format(chars))
+            i = end + 1
+        else:
+            ret.append(re.escape(pattern[i]))
+            i += 1
+
+    return ''.join(ret)
+
+
+class IgnoreRules(object):
+    '''
+    .gitignore-style patterns for the files under base_dir (the relative path to the project)
+    '''
+    def __init__(self, base_dir, lines):
+        self.base_dir = base_dir
+        self.rules = []     # (regex, is_negated, dir_only, is_anchored)
+
+        for line in lines:
+            line = line.rstrip('\r\n')
+            if len(line.strip()) == 0 or line.startswith('#'):
+                continue
+
+            is_negated = line.startswith('!')
+            if is_negated:
+                line = line[1:]
+
+            line = line.rstrip()
+            dir_only = line.endswith('/')
+            line = line.rstrip('/')
+
+            # patterns with a separator are relative to base_dir, others match the names in any level
+            is_anchored = '/' in line
+            line = line.lstrip('/')
+            if len(line) == 0:
+                continue
+
+            regex = re.compile(_translate(line) + r'\Z')
+            self.rules.append((regex, is_negated, dir_only, is_anchored))
+
+
+    @classmethod
+    def from_file(cls, base_dir, fpath):
+        try:
+            with open(fpath, 'r', errors='ignore') as f:
+                return cls(base_dir, f.readlines())
+        except OSError:
+            return None
+
+
+    def match(self, rel_path, name, is_dir):
+        '''
+        True: ignored, False: re-included by '!', None: no matched pattern
+        '''
+        if self.base_dir:
+            rel_path = rel_path[len(self.base_dir)+1:]
+
+        ret = None
+        for regex, is_negated, dir_only, is_anchored in self.rules:
+            if dir_only and not is_dir:
+                continue
+
+            # the last matched pattern decides
+            if regex.match(rel_path if is_anchored else name):
+                ret = not is_negated
+
+        return ret
+
+
+class ProjectWalker(object):
+    '''
+    walk the project by os.scandir, with the default ignore patterns and the .gitignore files in the project
+    '''
+    def __init__(self, ignore_patterns=None, prune_patterns=None, use_gitignore=True):
+        self.default_rules = IgnoreRules('', ignore_patterns or [])
+        # the vendored and VCS directories are never entered
+        self.prune_rules = IgnoreRules('', prune_patterns or [])
+        self.use_gitignore = use_gitignore
+        self.ignored = []           # the pruned directories and the virtual environments skipped in the last walk
+
+
+    def _is_ignored(self, rules_list, rel_path, name, is_dir):
+        # the deepest .gitignore first
+        for rules in reversed(rules_list):
+            ret = rules.match(rel_path, name, is_dir)
+            if ret is not None:
+                return ret
+
+        return False
+
+
+    def walk(self, root_dir, dir_filter=None):
+        '''
+        yield (path, DirEntry, is_ignored) for the directories and files, top-down and breadth-first
+        the ignored entries are also yielded (the names of local modules), everything in an ignored directory is ignored
+        the pruned directories are neither yielded nor entered
+        dir_filter(name) decides whether to enter a directory, the root is not yielded
+        '''
+        self.ignored = []
+        visited_dirs = {os.path.realpath(root_dir)}
+
+        dir_queue = deque([(root_dir, '', [self.default_rules, ], None, False), ])
+        while len(dir_queue) > 0:
+            py_dir, rel_dir, rules_list, dir_entry, dir_ignored = dir_queue.popleft()
+            try:
+                with os.scandir(py_dir) as it:
+                    entries = list(it)
+            except OSError:
+                continue
+
+            names = {entry.name for entry in entries}
+            if rel_dir and 'pyvenv.cfg' in names:
+                # virtual environments
+                self.ignored.append(py_dir)
+                continue
+
+            if dir_entry is not None:
+                yield py_dir, dir_entry, dir_ignored
+
+            if self.use_gitignore and not dir_ignored and '.gitignore' in names:
+                rules = IgnoreRules.from_file(rel_dir, os.path.join(py_dir, '.gitignore'))
+                if rules is not None:
+                    rules_list = rules_list + [rules, ]
+
+            for entry in entries:
+                name = entry.name
+                rel_path = '{}/{}'.format(rel_dir, name) if rel_dir else name
+                try:
+                    is_dir = entry.is_dir()
+                    is_file = not is_dir and entry.is_file()
+                except OSError:
+                    continue
+
+                if not is_dir and not is_file:
+                    continue
+
+                if is_dir and self.prune_rules.match(rel_path, name, True):
+                    # one entry for the whole directory
+                    self.ignored.append(entry.path)
+                    continue
+
+                is_ignored = dir_ignored or self._is_ignored(rules_list, rel_path, name, is_dir)
+
+                if is_file:
+                    yield entry.path, entry, is_ignored
+
+                elif dir_filter is None or dir_filter(name):
+                    if entry.is_symlink():
+                        # the linked directories are entered once
+                        real_path = os.path.realpath(entry.path)
+                        if real_path in visited_dirs:
+                            continue
+                        visited_dirs.add(real_path)
+
+                    dir_queue.append((entry.path, rel_path, rules_list, entry, is_ignored))
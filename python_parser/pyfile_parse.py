@@ -1,38 +1,69 @@
 import os
+import pickle
+import hashlib
+import collections
+from bisect import bisect_left
 from tree_sitter import Language, Parser
+from .syntax_query import SyntaxQuery, SYNTAX_CAPTURES
+from .name_trie import NameTrie
+
+
+# the tree-sitter grammar libraries loaded in this process: {library file: Language}
+_loaded_languages = {}
+
+# change it when the extracted information is changed: the cached results are invalid
+PARSER_VERSION = '3'
+
+
+def _has_node_in(starts, start_byte, end_byte):
+    # any node starting in [start_byte, end_byte): starts are sorted
+    i = bisect_left(starts, start_byte)
+    return i < len(starts) and starts[i] < end_byte
+
+
+def _count_nodes_in(starts, start_byte, end_byte):
+    return bisect_left(starts, end_byte) - bisect_left(starts, start_byte)
 
 
 class astVisiter(object):
-    def __init__(self, builtin_funcs):
+    def __init__(self, builtin_funcs, syntax_query):
         self.builtin_funcs = builtin_funcs
-        self.judge_prefix = set()
+        self.syntax_query = syntax_query
+        self.builtin_trie = NameTrie(builtin_funcs)
 
         self.imported_modules = set()       # modules
         self.imported_resources = set()     # from xxx import resources (full name)
 
         self.import_names = set()   
+        self.import_trie = NameTrie()       # the import names for the prefix lookup
         self.alias_mappings = {}            # {used_name: full_name}
 
         self.called_attributes = []      # all attributes called in the code
-        self.assign_mappings = {}           # {variable: name}
+        self.called_trie = NameTrie()       # the called attributes for the prefix lookup
+        self.assign_mappings = NameTrie()   # {variable: name}
         self.imported_attrs = set()         # imported attributes called in the code
         self.builtin_attrs = set()          # built-in attributes called in the code
 
         self.has_error = False
         self.python_sytax = set()
+
+        self.content = b''                  # the source of the visited tree
     
 
     def clear(self):
         self.imported_modules = set()
         self.imported_resources = set()
         self.import_names = set()   
+        self.import_trie = NameTrie()
         self.alias_mappings = {}
         self.called_attributes = []
-        self.assign_mappings = {}
+        self.called_trie = NameTrie()
+        self.assign_mappings = NameTrie()
         self.imported_attrs = set()
         self.builtin_attrs = set()
         self.has_error = False
         self.python_sytax = set()
+        self.content = b''
     
 
     def print_all(self):
@@ -60,289 +91,146 @@ class astVisiter(object):
 
     def handle_attr(self):
         # get the fully qualified name for called attributes
-        sorted_keys = sorted(self.import_names, key=lambda item:len(item), reverse=True)
         for item in self.called_attributes:
-            is_imported = False
-            for key in sorted_keys:
-                if item == key or item.startswith(key+'.'):
-                    if key in self.alias_mappings:
-                        item = '{}{}'.format(self.alias_mappings[key], item[len(key):])
-                    self.imported_attrs.add(item)
-
-                    is_imported = True
-                    break
-            
-            if not is_imported:
+            # the longest import name
+            key = self.import_trie.get_longest_prefix(item)
+            if key is not None:
+                if key in self.alias_mappings:
+                    item = '{}{}'.format(self.alias_mappings[key], item[len(key):])
+                self.imported_attrs.add(item)
+            else:
                 self.builtin_attrs.add(item)
 
 
-    def visit_root(self, root_node):
-        # for Python syntax
-        self._walk_ast_for_syntax(root_node)
-
-        # for global infomation
-        self._get_global_imports(root_node)
-
-        self.judge_prefix = self.builtin_funcs | self.import_names
-
-        # for used attributes
-        self.walk_ast(root_node)
-        
-    
+    def _get_text(self, node):
+        # Node.text of the binding leaks the copied bytes
+        return self.content[node.start_byte:node.end_byte]
 
-    def _get_all_child_type(self, root):
-        ret = set()
 
-        if isinstance(root, list):
-            st = root[:]
-        else:
-            st = [root, ]
+    def visit_root(self, root_node, content):
+        self.content = content
+        captured_nodes = self.syntax_query.captures(root_node)
 
-        while st:
-            node = st.pop()
-            ret.add(node.type)
-            st.extend(node.children)
-        
-        return ret
+        # for global infomation
+        for node in captured_nodes['import']:
+            if node.parent != root_node:
+                continue
 
+            try:
+                self._get_import_statement(node)
+            except (AttributeError, UnicodeDecodeError):
+                pass
 
-    def _walk_ast_for_syntax(self, node):
-        node_type = node.type
+        self.import_trie = NameTrie(self.import_names)
 
-        # if node_type != 'comment':
-        #     print(node_type)
+        # for Python syntax
+        self._check_syntax(captured_nodes)
+
+        # for used attributes: in the pre-order of the tree
+        for node in captured_nodes['attribute']:
+            try:
+                self._check_attribute(node)
+            except (AttributeError, IndexError, UnicodeDecodeError):
+                # incomplete nodes: only skip this node
+                pass
+    
 
-        if node_type == 'ERROR':
+    def _check_syntax(self, captured_nodes):
+        if len(captured_nodes['error']) > 0:
             self.has_error = True
 
-        elif node_type == 'print':
-            self.python_sytax.add('<3')
-        
-        elif node_type == 'exec':
-            self.python_sytax.add('<3')
-        
-        elif node_type == 'async' or node_type == 'await':
-            self.python_sytax.add('>=3.5')
-        
-        elif node_type == '<>':
-            self.python_sytax.add('<3')
-        
-        elif node_type == 'nonlocal':
-            self.python_sytax.add('>=3')
-
-        elif node_type == 'except_clause':
-            # except exc, var
-            for child in node.children:
-                if ',' == child.type:
-                    self.python_sytax.add('<3')
-                    break
+        for name, syntax in SYNTAX_CAPTURES.items():
+            if len(captured_nodes[name]) > 0:
+                self.python_sytax.add(syntax)
 
-        elif node_type == 'integer':
-            # long number
-            i = node.text.decode()
-            if i.endswith('l') or i.endswith('L'):
-                self.python_sytax.add('<3')
-            
-            if '_' in i:
-                self.python_sytax.add('>=3.6')
-            
-            # octal number: starts with 0 and are numbers (not 0)
-            if i.startswith('0'):
-                i = '0{}'.format(i.lstrip('0'))
-                if len(i) > 1 and i[1] > '1' and i[1] < '9':
-                    self.python_sytax.add('<3')
+        for node in captured_nodes['integer']:
+            try:
+                self._check_integer(self._get_text(node).decode())
+            except UnicodeDecodeError:
+                pass
         
-        elif node_type == 'string':
-            s = node.text.decode().lower()
-            if s.startswith('`'):
+        for node in captured_nodes['string']:
+            # the prefix is enough
+            s = self.content[node.start_byte:min(node.end_byte, node.start_byte+2)].lower()
+            if s.startswith(b'`'):
                 self.python_sytax.add('<3')
 
-            elif s.startswith('u'):
+            elif s.startswith(b'u'):
                 # s = u'unicode'
                 self.python_sytax.add('!=3.0.*,!=3.1.*,!=3.2.*')
 
-            elif s.startswith('f'):
+            elif s.startswith(b'f'):
                 self.python_sytax.add('>=3.6')
             
-            elif s.startswith('rb'):
+            elif s.startswith(b'rb'):
                 self.python_sytax.add('>=3.3')
 
-        elif node_type == 'function_definition':
-            ret_type = node.child_by_field_name('return_type')
-            if ret_type:
-                # def func() -> int:
+        for node in captured_nodes['raise_cause']:
+            # raise EXCEPTION from CAUSE
+            if node.type == 'none':
+                # raise EXCEPTION from None
+                self.python_sytax.add('>=3.3')
+            else:
                 self.python_sytax.add('>=3')
-            
-            para = node.child_by_field_name('parameters')
-            for child in para.children:
-                child_type = child.type
-                if child_type == 'typed_parameter' or child_type == 'typed_default_parameter' or child_type == 'keyword_separator':
-                    # def func(parm1:int): / def func(parm1, *, parm2)
-                    self.python_sytax.add('>=3')
-                elif child_type == 'tuple_pattern':
-                    # def func((parm1, parm2))
-                    self.python_sytax.add('<3')
-                elif child_type == 'positional_separator':
-                    # def func(parm1, /, parm2)
-                    self.python_sytax.add('>=3.8')
-            
-            if node.children[0].type == 'async':
-                child_types = self._get_all_child_type(node)
-                if 'yield' in child_types:
+
+        # the syntax depending on the subtree
+        yield_starts = [node.start_byte for node in captured_nodes['yield']]
+        await_starts = [node.start_byte for node in captured_nodes['await']]
+        splat_starts = [node.start_byte for node in captured_nodes['splat']]
+
+        if len(yield_starts) > 0:
+            for node in captured_nodes['async_function']:
+                if _has_node_in(yield_starts, node.start_byte, node.end_byte):
                     # 'yield' inside async function
                     self.python_sytax.add('>=3.6')
-
-        elif node_type == 'class_definition':
-            # class A(a=object, *b, **c):
-            arg_list = node.child_by_field_name('superclasses')
-            if arg_list:
-                for child in arg_list.children:
-                    child_type = child.type
-                    if child_type == 'list_splat' or child_type == 'dictionary_splat' or child_type == 'keyword_argument':
-                        self.python_sytax.add('>=3')
-                        break
+                    break
         
-        elif node_type == 'assignment':
-            # a, *b = 
-            left_node = node.child_by_field_name('left')
-            child_types = self._get_all_child_type(left_node)
-            if 'list_splat_pattern' in child_types:
-                self.python_sytax.add('>=3')
-            
-            # a: str
-            type_node = node.child_by_field_name('type')
-            if type_node:
-                self.python_sytax.add('>=3.6')
+        if len(yield_starts) > 0 or len(await_starts) > 0:
+            for node in captured_nodes['comprehension']:
+                self._check_comprehension(node, yield_starts, await_starts)
         
-        elif node_type == 'raise_statement':
-            # raise E, V, T
-            if len(node.children) > 1 and node.children[1].type == 'expression_list':
-                self.python_sytax.add('<3')
-
-            # raise EXCEPTION from CAUSE
-            cause_node = node.child_by_field_name('cause')
-            if cause_node:
-                if cause_node.type == 'none':
-                    # raise EXCEPTION from None
-                    self.python_sytax.add('>=3.3')
-                else:
+        if len(splat_starts) > 0:
+            for node in captured_nodes['assign_left']:
+                if _has_node_in(splat_starts, node.start_byte, node.end_byte):
+                    # a, *b = 
                     self.python_sytax.add('>=3')
-        
-        elif node_type == 'yield':
-            # yield from
-            for child in node.children:
-                if child.type == 'from':
-                    self.python_sytax.add('>=3.3')
                     break
-        
-        elif node_type == 'binary_operator' or node_type == 'augmented_assignment':
-            op = node.child_by_field_name('operator')
-            if op.type == '@' or op.type == '@=':
-                self.python_sytax.add('>=3.5')
-        
-        elif node_type == 'generator_expression':
-            check_nodes = []
-            is_first = True
-            for child in node.children:
-                if is_first and child.type == 'for_in_clause':
-                    # aside from the iterable expression in the leftmost for clause
-                    is_first = False
-                    right_node = child.child_by_field_name('right')
-                    p = child.children[0]
-                    while p and p != right_node:
-                        check_nodes.append(p)
-                        p = p.next_sibling
-                else:
-                    check_nodes.append(child)
-            
-            check_types = self._get_all_child_type(check_nodes)
-            if 'yield' in check_types:
-                self.python_sytax.add('<3.8')
+    
 
-            for child in node.children:
-                if child.type == 'if_clause':
-                    # Unparenthesized lambda expressions can no longer be the expression part in an if clause in comprehensions and generator expressions.
-                    for p in child.children:
-                        if p.type == 'lambda':
-                            self.python_sytax.add('<3.9')
-                            break
+    def _check_integer(self, i):
+        # long number
+        if i.endswith('l') or i.endswith('L'):
+            self.python_sytax.add('<3')
         
-        elif node_type in {'list', 'dictionary', 'set', 'tuple'}:
-            for child in node.children:
-                if child.type == 'list_splat' or child.type == 'dictionary_splat':
-                    self.python_sytax.add('>=3.5')
-                    break
+        if '_' in i:
+            self.python_sytax.add('>=3.6')
         
-        elif node_type in {'list_comprehension', 'dictionary_comprehension', 'set_comprehension'}:
-            if node_type == 'list_comprehension':
-                for child in node.children:
-                    if child.type == 'for_in_clause':
-                        p = child.child_by_field_name('right')
-                        while p:
-                            # [... for var in item1, item2, ...]
-                            if p.type == ',':
-                                self.python_sytax.add('<3')
-                                break
-                            p = p.next_sibling
-            
-            check_nodes = []
-            is_first = True
+        # octal number: starts with 0 and are numbers (not 0)
+        if i.startswith('0'):
+            i = '0{}'.format(i.lstrip('0'))
+            if len(i) > 1 and i[1] > '1' and i[1] < '9':
+                self.python_sytax.add('<3')
+    
+
+    def _check_comprehension(self, node, yield_starts, await_starts):
+        start_byte, end_byte = node.start_byte, node.end_byte
+
+        # yield expressions aside from the iterable expression in the leftmost for clause
+        yield_num = _count_nodes_in(yield_starts, start_byte, end_byte)
+        if yield_num > 0:
             for child in node.children:
-                if is_first and child.type == 'for_in_clause':
-                    # aside from the iterable expression in the leftmost for clause
-                    is_first = False
+                if child.type == 'for_in_clause':
                     right_node = child.child_by_field_name('right')
-                    p = child.children[0]
-                    while p and p != right_node:
-                        check_nodes.append(p)
-                        p = p.next_sibling
-                else:
-                    check_nodes.append(child)
+                    if right_node:
+                        yield_num -= _count_nodes_in(yield_starts, right_node.start_byte, child.end_byte)
+                    break
             
-            check_types = self._get_all_child_type(check_nodes)
-            if 'yield' in check_types:
+            if yield_num > 0:
                 self.python_sytax.add('<3.8')
-
-            child_types = self._get_all_child_type(node)
-            # await expressions in all kinds of comprehensions
-            if 'await' in child_types:
-                self.python_sytax.add('>=3.6')
-
-            for child in node.children:
-                if child.type == 'if_clause':
-                    for p in child.children:
-                        if p.type == 'lambda':
-                            self.python_sytax.add('<3.9')
-                            break
         
-        elif node_type == 'for_in_clause':
-            if node.children[0].type == 'async':
-                # async for in list, set, dict comprehensions and generator expressions
-                self.python_sytax.add('>=3.6')
-        
-        elif node_type == 'named_expression':
-            # :=
-            self.python_sytax.add('>=3.8')
-        
-        elif node_type == 'finally_clause':
-            block_node = node.children[-1]
-            if block_node.type == 'block':
-                for child in block_node.children:
-                    # continue statement direct in the finally clause
-                    if child.type == 'continue_statement':
-                        self.python_sytax.add('>=3.8')
-                        break
-        
-        elif node_type == 'with_item':
-            val_node = node.child_by_field_name('value')
-            if val_node.type == 'tuple':
-                self.python_sytax.add('>=3.9')
-        
-        elif node_type == 'match_statement':
-            self.python_sytax.add('>=3.10')
-
-        for child in node.children:
-            self._walk_ast_for_syntax(child)
+        if node.type != 'generator_expression' and _has_node_in(await_starts, start_byte, end_byte):
+            # await expressions in all kinds of comprehensions
+            self.python_sytax.add('>=3.6')
 
 
     def _get_import_list(self, node, prefix_module=None):
@@ -356,7 +244,7 @@ class astVisiter(object):
         )
         '''
         if node.type == 'dotted_name':
-            name = node.text.decode()
+            name = self._get_text(node).decode()
             self.import_names.add(name)
 
             if prefix_module is not None:
@@ -374,8 +262,8 @@ class astVisiter(object):
                 field('alias', $.identifier)
             )
             '''
-            name = node.child_by_field_name('name').text.decode()
-            alias_name = node.child_by_field_name('alias').text.decode()
+            name = self._get_text(node.child_by_field_name('name')).decode()
+            alias_name = self._get_text(node.child_by_field_name('alias')).decode()
 
             self.import_names.add(alias_name)
             if prefix_module is not None:
@@ -387,62 +275,62 @@ class astVisiter(object):
                 self.imported_modules.add(name)
 
 
-    def _get_global_imports(self, root_node):
-        for node in root_node.children:
-            node_type = node.type
-            if node_type == 'future_import_statement':
-                '''
-                future_import_statement: $ => seq(
-                    'from',
-                    '__future__',
-                    'import',
-                    choice(
-                        $._import_list,
-                        seq('(', $._import_list, ')'),
-                    )
+    def _get_import_statement(self, node):
+        # the import statements in the module level
+        node_type = node.type
+        if node_type == 'future_import_statement':
+            '''
+            future_import_statement: $ => seq(
+                'from',
+                '__future__',
+                'import',
+                choice(
+                    $._import_list,
+                    seq('(', $._import_list, ')'),
                 )
-                '''
-                self.imported_modules.add('__future__')
-                for child in node.children:
-                    self._get_import_list(child, '__future__')
+            )
+            '''
+            self.imported_modules.add('__future__')
+            for child in node.children:
+                self._get_import_list(child, '__future__')
 
-            elif node_type == 'import_statement':
-                '''
-                import_statement: $ => seq(
-                    'import',
-                    $._import_list
-                )
-                '''
-                for child in node.children:
-                    self._get_import_list(child)
+        elif node_type == 'import_statement':
+            '''
+            import_statement: $ => seq(
+                'import',
+                $._import_list
+            )
+            '''
+            for child in node.children:
+                self._get_import_list(child)
 
-            elif node_type == 'import_from_statement':
-                '''
-                import_from_statement: $ => seq(
-                    'from',
-                    field('module_name', choice(
-                        $.relative_import,
-                        $.dotted_name
-                    )),
-                    'import',
-                    choice(
-                        $.wildcard_import,
-                        $._import_list,
-                        seq('(', $._import_list, ')')
-                    )
+        elif node_type == 'import_from_statement':
+            '''
+            import_from_statement: $ => seq(
+                'from',
+                field('module_name', choice(
+                    $.relative_import,
+                    $.dotted_name
+                )),
+                'import',
+                choice(
+                    $.wildcard_import,
+                    $._import_list,
+                    seq('(', $._import_list, ')')
                 )
-                '''
-                module = node.child_by_field_name('module_name').text.decode()
-                self.imported_modules.add(module)
-
-                children = node.children
-                for i in range(3, len(children)):
-                    child = children[i]
-                    if child.type != 'wildcard_import':
-                        self._get_import_list(child, module)
+            )
+            '''
+            module = self._get_text(node.child_by_field_name('module_name')).decode()
+            self.imported_modules.add(module)
+
+            children = node.children
+            for i in range(3, len(children)):
+                child = children[i]
+                if child.type != 'wildcard_import':
+                    self._get_import_list(child, module)
     
 
-    def walk_ast(self, node):
+    def _check_attribute(self, node):
         # for the called attributes: contain the assign mappings
         node_type = node.type    
 
@@ -463,14 +351,14 @@ class astVisiter(object):
             while p and p.type == 'assignment':
                 left_node = p.child_by_field_name('left')
                 if left_node.type == 'identifier':
-                    left_name = left_node.text.decode()
+                    left_name = self._get_text(left_node).decode()
                     if left_name not in self.import_names:
                         left_variables.add(left_name)
 
                 elif left_node.type == 'pattern_list':
                     for item in left_node.children:
                         if item.type == 'identifier':
-                            self.assign_mappings.pop(item.text.decode(), None)
+                            self.assign_mappings.remove(self._get_text(item).decode())
 
                 p = p.child_by_field_name('right')
             
@@ -480,161 +368,306 @@ class astVisiter(object):
                 if p:
                     right_attr = self._get_primary_expression(p)
                 else:
-                    type_name = node.child_by_field_name('type').text.decode()
+                    type_name = self._get_text(node.child_by_field_name('type')).decode()
                     if type_name in {'bool', 'dict', 'float', 'int', 'list', 'set', 'str', 'tuple'}:
                         right_attr = type_name
                 
                 if right_attr and self._save_attribute(right_attr):
                     for item in left_variables:
-                        self.assign_mappings[item] = right_attr
+                        self.assign_mappings.add(item, right_attr)
                 else:
                     # clear the mappings of all left variables
                     for item in left_variables:
-                        self.assign_mappings.pop(item, None)
+                        self.assign_mappings.remove(item)
 
         elif node_type == 'attribute' or node_type == 'call':
             attr = self._get_primary_expression(node)
             if attr:
                 self._save_attribute(attr)
 
-        for child in node.children:
-            self.walk_ast(child)
-    
 
     def _get_primary_expression(self, node):
         # identifier, attribute, call
-        node_type = node.type
-        if node_type == 'identifier':
-            return node.text.decode()
-
-        elif node_type == 'attribute':
-            '''
-            attribute: $ => prec(PREC.call, seq(
-                field('object', $.primary_expression),
-                '.',
-                field('attribute', $.identifier)
-            ))
-            '''
-            object_node = node.child_by_field_name('object')
-            attr = node.child_by_field_name('attribute').text.decode()
-
-            prefix_name = self._get_primary_expression(object_node)
-            if prefix_name is not None:
-                attribute = '{}.{}'.format(prefix_name, attr)
-                return attribute
+        attr_list = []
+        while True:
+            node_type = node.type
+            if node_type == 'attribute':
+                '''
+                attribute: $ => prec(PREC.call, seq(
+                    field('object', $.primary_expression),
+                    '.',
+                    field('attribute', $.identifier)
+                ))
+                '''
+                attr_list.append(self._get_text(node.child_by_field_name('attribute')).decode())
+                node = node.child_by_field_name('object')
 
-        elif node_type == 'call':
-            '''
-            call: $ => prec(PREC.call, seq(
-                field('function', $.primary_expression),
-                field('arguments', choice(
-                    $.generator_expression,
-                    $.argument_list
+            elif node_type == 'call':
+                '''
+                call: $ => prec(PREC.call, seq(
+                    field('function', $.primary_expression),
+                    field('arguments', choice(
+                        $.generator_expression,
+                        $.argument_list
+                    ))
                 ))
-            ))
-            '''
-            function_node = node.child_by_field_name('function')
-            function_name = self._get_primary_expression(function_node)
-            if function_name is not None:
-                return function_name
+                '''
+                node = node.child_by_field_name('function')
+            
+            else:
+                break
+        
+        prefix_name = None
+        if node_type == 'identifier':
+            prefix_name = self._get_text(node).decode()
         
         elif node_type == 'string' or node_type == 'concatenated_string':
-            return 'str'
+            prefix_name = 'str'
         
         elif node_type == 'integer':
-            return 'int'
+            prefix_name = 'int'
         
         elif node_type == 'float':
-            return 'float'
+            prefix_name = 'float'
         
         elif node_type == 'true' or node_type == 'false':
-            return 'bool'
+            prefix_name = 'bool'
         
         elif node_type == 'list' or node_type == 'list_comprehension':
-            return 'list'
+            prefix_name = 'list'
         
         elif node_type == 'dictionary' or node_type == 'dictionary_comprehension':
-            return 'dict'
+            prefix_name = 'dict'
         
         elif node_type == 'set' or node_type == 'set_comprehension':
-            return 'set'
+            prefix_name = 'set'
         
         elif node_type == 'tuple':
-            return 'tuple'
+            prefix_name = 'tuple'
 
-        return None
+        if prefix_name is None:
+            return None
+
+        attr_list.append(prefix_name)
+        return '.'.join(reversed(attr_list))
     
 
     def _save_attribute(self, attr):
-        # replace attr by the assign mappings
-        sorted_keys = sorted(self.assign_mappings, key=lambda item:len(item), reverse=True)
+        # replace attr by the assign mappings: the longest variable first, each one is used once
+        used_keys = set()
 
         item = attr
         while True:
-            has_mapping = False
-            for key in sorted_keys:
-                if item == key or item.startswith(key+'.'):
-                    # replace by the assign mappings
-                    item = '{}{}'.format(self.assign_mappings[key], item[len(key):])
-                    has_mapping = True
-
-                    sorted_keys.remove(key)
-                    break
-            
-            if not has_mapping:
+            key = self.assign_mappings.get_longest_prefix(item, used_keys)
+            if key is None:
                 break
+
+            item = '{}{}'.format(self.assign_mappings.get(key), item[len(key):])
+            used_keys.add(key)
         
         # imported names or built-in functions
-        need_save = False
-        for key in self.judge_prefix:
-            if item == key or item.startswith(key+'.'):
-                need_save = True
-                break
-        
-        if not need_save:
+        if not self.import_trie.has_prefix_of(item) and not self.builtin_trie.has_prefix_of(item):
             return False
         
-        for i in range(1, len(self.called_attributes)+1):
-            if self.called_attributes[-i] == item or self.called_attributes[-i].startswith(item+'.'):
-                return False
+        # the attribute or a longer one is saved
+        if self.called_trie.has_extension_of(item):
+            return False
         
         self.called_attributes.append(item)
+        self.called_trie.add(item)
 
 
 
-class PythonParser(object):
-    def __init__(self, languages_dir, builtin_funcs):
+class ParseCache(object):
+    '''
+    LRU cache for the parse results: {content hash: info}, and the optional store in cache_dir
+    '''
+    def __init__(self, max_size, cache_dir=None):
+        self.max_size = max_size
+        self.cache_dir = cache_dir
+        self.entries = collections.OrderedDict()
+
+        if cache_dir is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+    
+
+    def _get_path(self, key):
+        return os.path.join(self.cache_dir, '{}.pkl'.format(key))
+    
+
+    def get(self, key):
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            return self.entries[key]
+        
+        if self.cache_dir is not None:
+            fpath = self._get_path(key)
+            if os.path.isfile(fpath):
+                with open(fpath, 'rb') as f:
+                    value = pickle.load(f)
+                self._put_memory(key, value)
+                return value
+        
+        return None
+    
+
+    def _put_memory(self, key, value):
+        if self.max_size <= 0:
+            return
+
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+    
+
+    def put(self, key, value):
+        self._put_memory(key, value)
+
+        if self.cache_dir is not None:
+            # other processes may use the same store
+            fpath = self._get_path(key)
+            tmp_path = '{}.{}.tmp'.format(fpath, os.getpid())
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(value, f)
+            os.replace(tmp_path, fpath)
+
+
+def _get_grammar_source(languages_dir):
+    return os.path.join(languages_dir, 'vendor/tree-sitter-python')
+
+
+def get_grammar_hash(languages_dir):
+    '''
+    the hash of the compiled grammar sources, or of the prebuilt library without the sources
+    '''
+    src_dir = os.path.join(_get_grammar_source(languages_dir), 'src')
+    if os.path.isdir(src_dir):
+        file_list = [os.path.join(src_dir, name) for name in ['parser.c', 'scanner.c', 'scanner.cc', 'tree_sitter/parser.h']]
+    else:
+        file_list = [os.path.join(languages_dir, 'build/my-languages.so'), ]
+    
+    grammar_hash = hashlib.sha1()
+    for fpath in file_list:
+        if os.path.isfile(fpath):
+            grammar_hash.update(os.path.basename(fpath).encode('utf-8'))
+            with open(fpath, 'rb') as f:
+                grammar_hash.update(f.read())
+    
+    return grammar_hash.hexdigest()
+
+
+def load_language(languages_dir, grammar_hash, grammar_dir=None):
+    '''
+    the grammar library is built once in grammar_dir (languages_dir/build by default), named by the hash of the sources
+    '''
+    src_path = _get_grammar_source(languages_dir)
+    if os.path.isdir(src_path):
+        if grammar_dir is None:
+            grammar_dir = os.path.join(languages_dir, 'build')
+        language_file = os.path.join(grammar_dir, 'python-{}.so'.format(grammar_hash))
+
+        if language_file not in _loaded_languages and not os.path.isfile(language_file):
+            # other processes may build the same library
+            os.makedirs(grammar_dir, exist_ok=True)
+            tmp_file = '{}.{}.tmp'.format(language_file, os.getpid())
+            Language.build_library(tmp_file, [src_path, ])
+            os.replace(tmp_file, language_file)
+    else:
+        # the prebuilt library
         language_file = os.path.join(languages_dir, 'build/my-languages.so')
-        Language.build_library(
-            # Store the library in the `build` directory
-            language_file,
     
-            # Include one or more languages
-            [
-                os.path.join(languages_dir, 'vendor/tree-sitter-python'),
-            ]
-        )
-        PY_LANGUAGE = Language(language_file, 'python')
-        self.parser = Parser()
-        self.parser.set_language(PY_LANGUAGE)
+    if language_file not in _loaded_languages:
+        _loaded_languages[language_file] = Language(language_file, 'python')
+    
+    return _loaded_languages[language_file]
+
+
+class PythonParser(object):
+    def __init__(self, languages_dir, builtin_funcs, cache_size=0, cache_dir=None, grammar_dir=None):
+        self.languages_dir = languages_dir
+        self.grammar_dir = grammar_dir
+        self.builtin_funcs = builtin_funcs
+
+        # the grammar is loaded at the first parse
+        self.grammar_hash = None
+        self.parser = None
+        self.visiter = None
+        self.import_visiter = None      # only imports and syntax features
+
+        # cache by the hash of the content, the parser, the grammar and the built-in functions
+        self.parse_cache = None
+        self.version_key = None
+        if cache_size > 0 or cache_dir is not None:
+            self.parse_cache = ParseCache(cache_size, cache_dir)
+    
+
+    def _get_grammar_hash(self):
+        if self.grammar_hash is None:
+            self.grammar_hash = get_grammar_hash(self.languages_dir)
+        
+        return self.grammar_hash
+    
 
-        self.visiter = astVisiter(builtin_funcs)
+    def _get_version_key(self):
+        if self.version_key is None:
+            version_hash = hashlib.sha1(PARSER_VERSION.encode('utf-8'))
+            version_hash.update(self._get_grammar_hash().encode('utf-8'))
+            version_hash.update('\n'.join(sorted(self.builtin_funcs)).encode('utf-8'))
+            self.version_key = version_hash.digest()
+        
+        return self.version_key
     
 
-    def parse(self, source_code, not_file=False):
-        self.visiter.clear()
+    def _init_parser(self):
+        py_language = load_language(self.languages_dir, self._get_grammar_hash(), self.grammar_dir)
+        self.parser = Parser()
+        self.parser.set_language(py_language)
 
+        self.visiter = astVisiter(self.builtin_funcs, SyntaxQuery(py_language))
+        self.import_visiter = astVisiter(self.builtin_funcs, SyntaxQuery(py_language, with_attributes=False))
+
+
+    def _parse_content(self, content, import_only=False):
+        if self.parser is None:
+            self._init_parser()
+        
+        visiter = self.import_visiter if import_only else self.visiter
+        visiter.clear()
+
+        tree = self.parser.parse(content)
+        visiter.visit_root(tree.root_node, content)
+        del tree
+
+        visiter.handle_attr()
+        return visiter.get_info()
+    
+
+    def parse(self, source_code, not_file=False, import_only=False):
+        '''
+        import_only: only the imports and syntax features, the attributes are empty
+        '''
         if not_file:
             # string to bytes
-            tree = self.parser.parse(source_code.encode('utf-8'))
+            content = source_code.encode('utf-8')
         else:
-            with open(source_code, 'rb') as f:
-                tree = self.parser.parse(f.read())
-        
-        try:
-            self.visiter.visit_root(tree.root_node)
-        except Exception:
-            pass
-
-        self.visiter.handle_attr()
-        return self.visiter.get_info()
+            try:
+                with open(source_code, 'rb') as f:
+                    content = f.read()
+            except OSError:
+                # unreadable (permission denied, dangling symlink, removed): the empty parse info
+                content = b''
+        
+        if self.parse_cache is None:
+            return self._parse_content(content, import_only)
+        
+        # the cached sets are copied: the results are modified by callers
+        mode = b'import' if import_only else b'all'
+        key = hashlib.sha1(self._get_version_key() + mode + content).hexdigest()
+        info = self.parse_cache.get(key)
+        if info is None:
+            info = self._parse_content(content, import_only)
+            self.parse_cache.put(key, {k: set(v) for k, v in info.items()})
+            return info
+        
+        return {k: set(v) for k, v in info.items()}
@@ -0,0 +1,134 @@
+import collections
+
+
+# captures giving the Python syntax directly
+SYNTAX_CAPTURES = {
+    'py2': '<3',
+    'py3': '>=3',
+    'py33': '>=3.3',
+    'py35': '>=3.5',
+    'py36': '>=3.6',
+    'py38': '>=3.8',
+    'py_lt39': '<3.9',
+    'py39': '>=3.9',
+    'py310': '>=3.10',
+}
+
+COMPREHENSION_TYPES = ['generator_expression', 'list_comprehension', 'dictionary_comprehension', 'set_comprehension']
+
+'''
+the patterns are compiled one by one: the ones not fitting the grammar are dropped
+'''
+# nodes for the called attributes and the assign mappings
+ATTRIBUTE_PATTERN = '[(assignment) (attribute) (call)] @attribute'
+
+QUERY_PATTERNS = [
+    # imports: the global ones are the children of the root (module or ERROR)
+    '[(import_statement) (import_from_statement) (future_import_statement)] @import',
+
+
+    '(ERROR) @error',
+
+    # print xxx / exec xxx / a <> b
+    '"print" @py2',
+    '"exec" @py2',
+    '"<>" @py2',
+    # except exc, var
+    '(except_clause "," @py2)',
+    # def func((parm1, parm2))
+    '(function_definition parameters: (parameters (tuple_pattern) @py2))',
+    # raise E, V, T
+    '(raise_statement . (expression_list) @py2)',
+    # [... for var in item1, item2, ...]
+    '(list_comprehension (for_in_clause right: (_) "," @py2))',
+
+    '"nonlocal" @py3',
+    # def func() -> int:
+    '(function_definition return_type: (_) @py3)',
+    # def func(parm1:int): / def func(parm1, *, parm2)
+    '(function_definition parameters: (parameters [(typed_parameter) (typed_default_parameter)] @py3))',
+    '(function_definition parameters: (parameters (keyword_separator) @py3))',
+    # class A(a=object, *b, **c):
+    '(class_definition superclasses: (argument_list [(list_splat) (dictionary_splat) (keyword_argument)] @py3))',
+
+    # yield from
+    '(yield "from" @py33)',
+
+    '"async" @py35',
+    '"await" @py35',
+    # a @ b / a @= b
+    '(binary_operator operator: "@" @py35)',
+    '(augmented_assignment operator: "@=" @py35)',
+    # [*a, *b] / {**a, **b}
+    '(list [(list_splat) (dictionary_splat)] @py35)',
+    '(dictionary (dictionary_splat) @py35)',
+    '(set [(list_splat) (dictionary_splat)] @py35)',
+    '(tuple [(list_splat) (dictionary_splat)] @py35)',
+
+    # async for in list, set, dict comprehensions and generator expressions
+    '(for_in_clause "async" @py36)',
+    # a: str
+    '(assignment type: (_) @py36)',
+
+    # :=
+    '(named_expression) @py38',
+    # def func(parm1, /, parm2)
+    '(function_definition parameters: (parameters (positional_separator) @py38))',
+    # continue statement direct in the finally clause
+    '(finally_clause (block (continue_statement) @py38))',
+
+    # with (open(a) as f, open(b) as g):
+    '(with_item value: (tuple) @py39)',
+
+    '(match_statement) @py310',
+
+    # checked by the text
+    '(integer) @integer',
+    '(string) @string',
+    '(raise_statement cause: (_) @raise_cause)',
+
+    # checked by the subtrees
+    '(function_definition "async") @async_function',
+    '(yield) @yield',
+    '"await" @await',
+    '(assignment left: (_) @assign_left)',
+    '(list_splat_pattern) @splat',
+]
+
+for comprehension_type in COMPREHENSION_TYPES:
+    # Unparenthesized lambda expressions can no longer be the expression part in an if clause in comprehensions and generator expressions.
+    QUERY_PATTERNS.append('({} (if_clause (lambda) @py_lt39))'.format(comprehension_type))
+    QUERY_PATTERNS.append('({}) @comprehension'.format(comprehension_type))
+
+
+class SyntaxQuery(object):
+    '''
+    the imports, syntax markers and attribute nodes matched by one tree-sitter query
+    without attributes: only the imports and syntax markers, for the import-only inference
+    '''
+    def __init__(self, language, with_attributes=True):
+        self.patterns = []
+        if with_attributes:
+            self.patterns.append(ATTRIBUTE_PATTERN)
+
+        for pattern in QUERY_PATTERNS:
+            try:
+                language.query(pattern)
+            except (NameError, SyntaxError):
+                # the node type or the field is not in the grammar (NameError), or the structure is impossible (SyntaxError)
+                continue
+
+            self.patterns.append(pattern)
+
+        self.query = language.query('\n'.join(self.patterns))
+
+
+    def captures(self, root_node):
+        '''
+        {capture name: [nodes]}, the nodes are in the pre-order of the tree
+        '''
+        captured_nodes = collections.defaultdict(list)
+        for node, name in self.query.captures(root_node):
+            captured_nodes[name].append(node)
+
+        return captured_nodes
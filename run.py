@@ -11,26 +11,41 @@ from kg_api.kg_query import QueryApplication
 
 from env_validation.template import match_templates
 from env_validation.validate import Validator
-from utils.handle_unknown import get_similar_packages
-from utils.variables import VALIDATION_NUM, NEO4J_URI, NEO4J_USER, NEO4J_PWD
+from utils.handle_unknown import get_similar_packages, SimilarityPool
+from utils.symbol_table import symbol_table
+from utils.version_table import version_table
+from utils.specifier_engine import specifier_engine
+from utils.variables import VALIDATION_NUM, SIM_PROCESS_NUM, PARSE_PROCESS_NUM, PARSE_CACHE_SIZE, PARSE_CACHE_DIR, PARSE_GRAMMAR_DIR,\
+                            PARSE_IGNORE_PATTERNS, PARSE_PRUNE_PATTERNS, PARSE_MAX_FILE_SIZE, PARSE_MAX_FILE_NUM,\
+                            PARSE_MANIFESTS, SYMBOL_TABLE_SIZE, VERSION_TABLE_SIZE, SPECIFIER_ENGINE_SIZE, NEO4J_URI, NEO4J_USER, NEO4J_PWD
 
 
 class AutomaticInference(object):
-    def __init__(self, languages_dir):
+    def __init__(self, languages_dir, sim_process_num=SIM_PROCESS_NUM, parse_process_num=PARSE_PROCESS_NUM):
         self.kg_querier = QueryApplication(NEO4J_URI, NEO4J_USER, NEO4J_PWD)
 
         with self.kg_querier.driver.session(default_access_mode=neo4j.READ_ACCESS) as session:
             standard_libs = set(session.read_transaction(QueryApplication.query_standard_libraries))
             builtin_funcs = set(session.read_transaction(QueryApplication.query_builtin_resources))
 
-        self.code_parser = projectParser(languages_dir, standard_libs, builtin_funcs)
+        self.code_parser = projectParser(languages_dir, standard_libs, builtin_funcs, parse_process_num, cache_size=PARSE_CACHE_SIZE, cache_dir=PARSE_CACHE_DIR,\
+                                         ignore_patterns=PARSE_IGNORE_PATTERNS, prune_patterns=PARSE_PRUNE_PATTERNS, max_file_size=PARSE_MAX_FILE_SIZE, max_file_num=PARSE_MAX_FILE_NUM,\
+                                         grammar_dir=PARSE_GRAMMAR_DIR, read_manifests=PARSE_MANIFESTS)
         self.candidate_discovery = DiscoveryApplication(self.kg_querier, standard_libs, builtin_funcs)
         self.ratio_calculator = self.candidate_discovery.load_all_pks()
+
+        # long-lived processes for the similarity of unknown modules
+        self.sim_pool = None
+        if sim_process_num > 0 and self.ratio_calculator.index is None and not self.ratio_calculator.vectorized:
+            self.sim_pool = SimilarityPool(self.ratio_calculator, sim_process_num)
+            self.ratio_calculator.pool = self.sim_pool
+
         self.env_generator = EnvGenerator(self.kg_querier, self.ratio_calculator)
         self.env_validator = Validator()
 
         self.val_stime = None
         self.infer_res = []
+        self.import_only = False
 
         self.related_exceptions = {'ImportError', 'ModuleNotFoundError', 'SyntaxError', 'AttributeError'}
     
@@ -41,6 +56,13 @@ class AutomaticInference(object):
 
     
     def close(self):
+        if self.sim_pool is not None:
+            self.ratio_calculator.pool = None
+            self.sim_pool.close()
+
+        self.ratio_calculator.cache.save()
+        self.code_parser.close()
+
         self.kg_querier.close()
         self.env_validator.close()
 
@@ -249,16 +271,29 @@ class AutomaticInference(object):
         
     
 
-    def main(self, src_path, validation_setting=None, existing_env=None):
+    def main(self, src_path, validation_setting=None, existing_env=None, import_only=False):
         '''
         validation_setting: {}
         existing_env: (pyver, {pkg: version})
+        import_only: the fast inference only by the imports and syntax features, without attribute matching and validation,
+                     the inferred environment is a lower-fidelity first guess (self.import_only is set)
         '''
         time_list = [0.0, 0.0, 0.0, 0.0]
         src_path = os.path.abspath(src_path)
+        self.import_only = import_only
+
+        # bound the interned names in batch runs
+        if len(symbol_table) > SYMBOL_TABLE_SIZE:
+            symbol_table.clear()
+        if len(version_table) > VERSION_TABLE_SIZE:
+            version_table.clear()
+        if len(specifier_engine) > SPECIFIER_ENGINE_SIZE:
+            specifier_engine.clear()
+        # the KG results are reused by the adjustments of this inference only
+        self.candidate_discovery.clear_memo()
 
         stime = time.time()
-        python_parse_info, third_parse_info = self.code_parser.parse(src_path)
+        python_parse_info, third_parse_info = self.code_parser.parse(src_path, import_only=import_only)
         time_list[0] = round(time.time() - stime, 3)
 
         # For the fairness of experiments
@@ -267,7 +302,8 @@ class AutomaticInference(object):
         install_info = None
         # [release, ], {top_module: {package: [version_obj, ]}}
         stime = time.time()
-        python_candidates, third_candidates = self.candidate_discovery.discover(python_parse_info, third_parse_info)
+        # the packages declared by the manifests of the project are the candidates of their top modules
+        python_candidates, third_candidates = self.candidate_discovery.discover(python_parse_info, third_parse_info, import_only, self.code_parser.requirements)
         time_list[1] = round(time.time() - stime, 3)
 
         validation_info = None
@@ -276,7 +312,7 @@ class AutomaticInference(object):
             install_info = self.env_generator.generate_candidate_environment()
             time_list[2] = round(time.time() - stime, 3)
 
-            if VALIDATION_NUM > 0 and validation_setting is not None and install_info is not None:
+            if VALIDATION_NUM > 0 and validation_setting is not None and install_info is not None and not import_only:
                 stime = time.time()
                 # the parms for validation
                 dockerfile_dir = validation_setting['dockerfile_dir']
@@ -299,9 +335,11 @@ class AutomaticInference(object):
         return install_info, time_list, validation_info
 
 
-def generate_dockerfile(env):
+def generate_dockerfile(env, import_only=False):
     pyver, install_list = env
     ret = []
+    if import_only:
+        ret.append('# Import-only inference: a lower-fidelity first guess without attribute matching and validation')
     ret.append(f'FROM python:{pyver}')
     if len(install_list) > 0:
         ret.append('RUN pip install --upgrade pip')
@@ -322,6 +360,7 @@ if __name__ == '__main__':
     parser.add_argument('--setting', '-s', help='Option: the Json file of validation settings.')
     parser.add_argument('--output', '-o', help='Option: the output file.')
     parser.add_argument('--env', '-e', help='Option: the Json file of local environments for code integration.')
+    parser.add_argument('--fast', '-f', action='store_true', help='Option: import-only inference, faster but lower fidelity (no attribute matching or validation).')
 
     parse_res = vars(parser.parse_args(sys.argv[1:]))
 
@@ -351,9 +390,15 @@ if __name__ == '__main__':
     
     # One-time use via the command line is inefficient, as some resources are required to be loaded.
     obj = AutomaticInference(lang_dir)
-    install_info, _, validation_info = obj.main(program_path, validation_setting, local_env)
+    install_info, _, validation_info = obj.main(program_path, validation_setting, local_env, parse_res['fast'])
+    skipped_files = obj.code_parser.skipped_files
     obj.close()
 
+    if any(skipped_files.values()):
+        # stderr: the Dockerfile may be printed to stdout
+        skipped_info = ', '.join('{} {}'.format(len(v), k.replace('_', ' ')) for k, v in skipped_files.items())
+        print(f'Not parsed in {program_path}: {skipped_info}', file=sys.stderr)
+
     if validation_info is None:
         inferred_env = install_info
     else:
@@ -362,7 +407,7 @@ if __name__ == '__main__':
     if inferred_env is None:
         print(f'Fail to infer runtime environment for {program_path}!')
     else:
-        dockerfile_content = generate_dockerfile(inferred_env)
+        dockerfile_content = generate_dockerfile(inferred_env, parse_res['fast'])
 
         outpath = parse_res['output']
         if outpath is None:
@@ -0,0 +1,82 @@
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from python_parser.project_parser import projectParser
+from utils.variables import PARSE_IGNORE_PATTERNS, PARSE_PRUNE_PATTERNS
+
+
+class EmptyParser(object):
+    # the parse info of every file and snippet is empty: no tree-sitter grammar is needed
+    def parse(self, source_code, not_file=False, import_only=False):
+        return {'imported_module': set(), 'imported_resource': set(), 'imported_attr': set(), 'builtin_attr': set(), 'python_syntax': set()}
+
+
+class SkippedFilesTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.project_dir = os.path.join(self.tmp_dir.name, 'proj')
+        os.makedirs(os.path.join(self.project_dir, 'mypkg'))
+        for rel_path in ['main.py', 'mypkg/__init__.py', 'mypkg/_version.py']:
+            with open(os.path.join(self.project_dir, rel_path), 'w') as f:
+                f.write('import os\n')
+        with open(os.path.join(self.project_dir, '.gitignore'), 'w') as f:
+            f.write('mypkg/_version.py\n')
+
+        self.parser = projectParser('', set(), set())
+        self.parser.pyfile_parser = EmptyParser()
+
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+
+    def test_snippet_keeps_skipped_files(self):
+        self.parser.parse(self.project_dir)
+        ignored_file = os.path.join(self.project_dir, 'mypkg', '_version.py')
+        self.assertEqual(self.parser.skipped_files['ignored'], [ignored_file])
+
+        # the validation adjustments parse snippets after the project
+        self.parser.parse('import sys\n', not_file=True)
+        self.assertEqual(self.parser.skipped_files['ignored'], [ignored_file])
+
+
+    def test_new_project_resets_skipped_files(self):
+        self.parser.parse(self.project_dir)
+        os.remove(os.path.join(self.project_dir, '.gitignore'))
+
+        self.parser.parse(self.project_dir)
+        self.assertEqual(self.parser.skipped_files['ignored'], [])
+
+
+class PrunedDirsTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.project_dir = os.path.join(self.tmp_dir.name, 'proj')
+        for rel_path in ['main.py', 'build/lib/mymod.py', 'node_modules/vendored/x.py', 'venv/lib/y.py']:
+            fpath = os.path.join(self.project_dir, rel_path)
+            os.makedirs(os.path.dirname(fpath), exist_ok=True)
+            with open(fpath, 'w') as f:
+                f.write('import os\n')
+
+        self.parser = projectParser('', set(), set(), ignore_patterns=PARSE_IGNORE_PATTERNS, prune_patterns=PARSE_PRUNE_PATTERNS)
+
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+
+    def test_vendored_dirs_are_pruned(self):
+        py_files, local_modules = self.parser._get_all_local_module_name(self.project_dir)
+        self.assertEqual(py_files, [os.path.join(self.project_dir, 'main.py')])
+
+        # the build outputs are local modules, the vendored directories are one entry each
+        self.assertIn('mymod', local_modules)
+        self.assertNotIn('vendored', local_modules)
+        self.assertEqual(sorted(self.parser.skipped_files['ignored']), [os.path.join(self.project_dir, x) for x in ['build/lib/mymod.py', 'node_modules', 'venv']])
+
+
+if __name__ == '__main__':
+    unittest.main()
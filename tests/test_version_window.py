@@ -0,0 +1,50 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.version_window import VersionWindow, get_series, get_version_windows
+
+
+def _select(window, versions):
+    # versions: [(version, upload time), ]
+    return [x[0] for x in window.select(versions, lambda x: x)]
+
+
+class VersionWindowTest(unittest.TestCase):
+    def test_series_of_pre_and_post_releases(self):
+        for version in ['1.0', '1', '1.0.3', '1.0rc1', '1.0.post1', '1.0.dev2', 'v1.0b1', '1.0.0a1']:
+            self.assertEqual(get_series(version), (0, 1, 0), version)
+
+        self.assertEqual(get_series('1.10rc1'), (0, 1, 10))
+        self.assertEqual(get_series('2!1.0'), (2, 1, 0))
+        self.assertNotEqual(get_series('1.1.post1'), get_series('1.0'))
+
+
+    def test_mixed_releases_are_grouped(self):
+        versions = [('1.0rc1', '2020-01-01'), ('1.0', '2020-02-01'), ('1.0.post1', '2020-03-01'), ('1.0.1', '2020-04-01'),\
+                    ('1.1a1', '2020-05-01'), ('1.1', '2020-06-01')]
+
+        # the newest 2 of the series 1.0 (with the pre- and post-releases) and of the series 1.1
+        self.assertEqual(_select(VersionWindow(2), versions), ['1.0.post1', '1.0.1', '1.1a1', '1.1'])
+        self.assertEqual(_select(VersionWindow(1), versions), ['1.0.1', '1.1'])
+
+
+    def test_undated_versions_are_kept(self):
+        versions = [('1.0', None), ('1.0.1', '2020-01-01'), ('1.0.2', '2020-02-01'), ('1.0.3', None)]
+
+        self.assertEqual(_select(VersionWindow(1), versions), ['1.0', '1.0.2', '1.0.3'])
+        self.assertEqual(_select(VersionWindow(0, '2020-01-15'), versions), ['1.0', '1.0.2', '1.0.3'])
+
+
+    def test_last_window_has_all_versions(self):
+        versions = [('1.0', '2020-01-01'), ('1.0.1', '2020-02-01')]
+
+        windows = get_version_windows([1, 5])
+        self.assertEqual([x.size for x in windows], [1, 5, 0])
+        self.assertTrue(windows[-1].is_full())
+        self.assertEqual(_select(windows[-1], versions), ['1.0', '1.0.1'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+import sys
+import collections
+from .variables import KG_CACHE_BYTES
+
+
+def get_size(obj, seen=None):
+    '''
+    the approximate memory (bytes) of obj with the containers and strings in it
+    '''
+    if seen is None:
+        seen = set()
+
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+
+    ret = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        for k, v in obj.items():
+            ret += get_size(k, seen) + get_size(v, seen)
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        for item in obj:
+            ret += get_size(item, seen)
+
+    return ret
+
+
+class BoundedCache(object):
+    '''
+    LRU cache bounded by the memory of the values, the least recently used entries are evicted
+    '''
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+
+        self.entries = collections.OrderedDict()     # {key: (value, cost)}
+        self.size = 0                               # the sum of the costs
+
+        # metrics
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+
+    def __len__(self):
+        return len(self.entries)
+
+
+    def __contains__(self, key):
+        return key in self.entries
+
+
+    def clear(self):
+        self.entries = collections.OrderedDict()
+        self.size = 0
+
+
+    def get(self, key, default=None):
+        entry = self.entries.get(key, None)
+        if entry is None:
+            self.misses += 1
+            return default
+
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return entry[0]
+
+
+    def put(self, key, value, cost=None):
+        '''
+        cost: the memory of value, estimated by get_size if it is None
+        '''
+        if cost is None:
+            cost = get_size(value)
+
+        if key in self.entries:
+            self.size -= self.entries.pop(key)[1]
+
+        if cost > self.max_bytes:
+            # larger than the whole cache
+            return
+
+        self.entries[key] = (value, cost)
+        self.size += cost
+        self._evict()
+
+
+    def _evict(self):
+        while self.size > self.max_bytes:
+            _, (_, old_cost) = self.entries.popitem(last=False)
+            self.size -= old_cost
+            self.evictions += 1
+
+
+    def get_metrics(self):
+        requests = self.hits + self.misses
+        return {
+            'entries': len(self.entries),
+            'bytes': self.size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / requests if requests > 0 else 0.0,
+        }
+
+
+# the KG results shared by the resolutions
+kg_cache = BoundedCache(KG_CACHE_BYTES)
@@ -1,33 +1,69 @@
 import re
 import collections
+import numpy as np
 from .variables import SIM_THRESHOLD
+from .sim_index import SubstringIndex
+from .symbol_table import symbol_table
+
+
+class MatchingKernel(object):
+    '''
+    the leaves of a program in a trie of dotted names, built once and scored against many spanning trees
+    '''
+    def __init__(self, leaves_set):
+        self.leaf_num = len(leaves_set)
+        self.nodes = {}         # {prefix name: node index}, the parents are before the children
+        self.parents = []       # parent node index, -1 for the top names
+        self.depths = []        # number of segments
+        self.leaves = []        # (node index, depth) of each leaf, in the order of leaves_set
+
+        for name in leaves_set:
+            parent = -1
+            for sid in symbol_table.get_prefixes(symbol_table.intern(name)):
+                prefix = symbol_table.get_name(sid)
+                index = self.nodes.get(prefix)
+                if index is None:
+                    index = self.nodes[prefix] = len(self.parents)
+                    self.parents.append(parent)
+                    self.depths.append(symbol_table.get_depth(sid))
+                parent = index
+
+            self.leaves.append((parent, self.depths[parent]))
+
+
+    def score(self, spanning_tree):
+        '''
+        the matching degree of the spanning tree, same as calculate_matching_degree
+        '''
+        if len(spanning_tree) == 0 or self.leaf_num == 0:
+            return 0.0
+
+        matched = set()
+        for name in spanning_tree:
+            index = self.nodes.get(name)
+            if index is not None:
+                matched.add(index)
+
+        # depth of the longest matched prefix of each node
+        matched_depths = [0] * len(self.parents)
+        for index, parent in enumerate(self.parents):
+            if index in matched:
+                matched_depths[index] = self.depths[index]
+            elif parent >= 0:
+                matched_depths[index] = matched_depths[parent]
+
+        ret = 0.0
+        for index, length in self.leaves:
+            ret += 1 - (length-matched_depths[index])/length
+
+        return ret/self.leaf_num
 
 
 def calculate_matching_degree(spanning_tree, leaves_set):
     '''
     For the matching degree
     '''
-    if len(spanning_tree) == 0 or len(leaves_set) == 0:
-        return 0.0
-    
-    ret = 0.0
-    for name in leaves_set:
-        if name in spanning_tree:
-            ret += 1
-        else:
-            split_info = name.split('.')
-            length = len(split_info)
-            prefix_name = name
-            i = 1
-            while i < length:
-                prefix_name = prefix_name[:-(len(split_info[-i])+1)]
-                if prefix_name in spanning_tree:
-                    break
-                i += 1
-        
-            ret += 1 - i/length
-
-    return ret/len(leaves_set)
+    return MatchingKernel(leaves_set).score(spanning_tree)
 
 
 '''
@@ -37,6 +73,15 @@ class TextSimilarity(object):
     def __init__(self, pkg_collections):
         self.pkg_collections = pkg_collections
         self.pkg_alias_collections = {x: None for x in self.pkg_collections}
+
+        # score all packages in one call instead of splitting them to processes
+        self.vectorized = False
+        # index for searching similar packages
+        self.index = None
+        # long-lived processes for the similarity
+        self.pool = None
+        # cached similar packages for unknown modules
+        self.cache = None
     
 
     def ratio(self, s1, s2):
@@ -68,6 +113,13 @@ class TextSimilarity(object):
             result.append((score, x))
                 
         return result
+    
+
+    def get_all_ratios(self, word):
+        '''
+        calculate the text similarity for all pkgs
+        '''
+        return self.get_ratios_for_pkgs(word, self.pkg_collections)
 
 
 '''
@@ -96,6 +148,13 @@ class NamingSimilarity(TextSimilarity):
             if pkg_alias != pkg:
                 # different
                 self.pkg_alias_collections[pkg] = pkg_alias
+    
+
+    def load_index(self, index_path=None):
+        '''
+        the substring index, built (or loaded from index_path) by the first search of similar packages
+        '''
+        self.index = SubstringIndex(self, index_path)
 
 
     def _calculate_ratio(self, matches, length):
@@ -148,4 +207,100 @@ class NamingSimilarity(TextSimilarity):
             if score >= cutoff:
                 result.append((score, x))
                 
-        return result
\ No newline at end of file
+        return result
+
+'''
+our naming similarity: scoring all packages at once
+'''
+class BatchNamingSimilarity(NamingSimilarity):
+    def __init__(self, pkg_collections):
+        super().__init__(pkg_collections)
+        self.vectorized = True
+
+        # all names: packages first, then their aliases
+        self.pkg_index = {x: i for i, x in enumerate(self.pkg_collections)}
+        name_list = list(self.pkg_collections)
+        owner_list = list(range(len(name_list)))
+        for pkg, alias_name in self.pkg_alias_collections.items():
+            if alias_name is not None:
+                name_list.append(alias_name)
+                owner_list.append(self.pkg_index[pkg])
+        
+        self.name_owners = np.array(owner_list, dtype=np.int64)     # index of the package for each name
+        self.name_lengths = np.array([len(x) for x in name_list], dtype=np.int64)
+
+        # compact alphabet: 0 is used for padding, the last code for unknown characters
+        alphabet = sorted(set(''.join(name_list)))
+        dtype = np.uint8 if len(alphabet) < 255 else np.uint16
+        self.char_codes = {c: i+1 for i, c in enumerate(alphabet)}
+        self.unknown_code = len(alphabet) + 1
+
+        max_length = int(self.name_lengths.max()) if len(name_list) > 0 else 0
+        self.name_matrix = np.zeros((len(name_list), max_length), dtype=dtype)
+        for i, name in enumerate(name_list):
+            self.name_matrix[i, :len(name)] = [self.char_codes[c] for c in name]
+        
+        # character histograms for quick_ratio
+        hist_dtype = np.uint8 if max_length < 256 else np.uint16
+        self.name_hists = np.zeros((len(name_list), self.unknown_code), dtype=hist_dtype)
+        rows = np.repeat(np.arange(len(name_list)), self.name_lengths)
+        np.add.at(self.name_hists, (rows, self.name_matrix[self.name_matrix > 0] - 1), 1)
+    
+
+    def _encode(self, word):
+        return np.array([self.char_codes.get(c, self.unknown_code) for c in word], dtype=self.name_matrix.dtype)
+    
+
+    def _batch_ratios(self, word, name_ids, cutoff):
+        '''
+        scores of word for the names in name_ids, 0.0 for the names not passing the cutoffs
+        '''
+        l1 = len(word)
+        lengths = self.name_lengths[name_ids] + l1
+
+        # real_quick_ratio
+        scores = np.zeros(len(name_ids))
+        keep = 2.0 * np.minimum(self.name_lengths[name_ids], l1) / lengths >= cutoff
+
+        # quick_ratio
+        codes = self._encode(word)
+        word_hist = np.bincount(codes, minlength=self.unknown_code+1)[1:self.unknown_code+1]
+        survivors = name_ids[keep]
+        intersect = np.minimum(self.name_hists[survivors], word_hist).sum(axis=1)
+        keep[keep] = 2.0 * intersect / lengths[keep] >= cutoff
+
+        survivors = name_ids[keep]
+        if len(survivors) == 0 or l1 == 0:
+            return scores
+
+        # ratio: longest common substring, one character of word per step over all names
+        names = self.name_matrix[survivors]
+        dp = np.zeros(names.shape, dtype=np.int16)
+        max_len = np.zeros(len(survivors), dtype=np.int64)
+        for c in codes:
+            prev = dp
+            dp = np.empty(names.shape, dtype=np.int16)
+            dp[:, 0] = names[:, 0] == c
+            dp[:, 1:] = (prev[:, :-1] + 1) * (names[:, 1:] == c)
+            np.maximum(max_len, dp.max(axis=1), out=max_len)
+
+        scores[keep] = 2.0 * max_len / lengths[keep]
+        return scores
+    
+
+    def get_ratios_for_pkgs(self, word, pkg_list, cutoff=SIM_THRESHOLD):
+        pkg_ids = np.array([self.pkg_index[x] for x in pkg_list], dtype=np.int64)
+        if len(pkg_ids) == len(self.pkg_collections):
+            name_ids = np.arange(len(self.name_owners))
+        else:
+            name_ids = np.flatnonzero(np.isin(self.name_owners, pkg_ids))
+
+        # the maximum score among the package name and its alias
+        pkg_scores = np.zeros(len(self.pkg_collections))
+        np.maximum.at(pkg_scores, self.name_owners[name_ids], self._batch_ratios(word, name_ids, cutoff))
+
+        result = []
+        for i in pkg_ids[pkg_scores[pkg_ids] >= cutoff]:
+            result.append((float(pkg_scores[i]), self.pkg_collections[i]))
+        
+        return result
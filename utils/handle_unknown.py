@@ -1,36 +1,122 @@
 import neo4j
+import os
 import math
+import pickle
 from heapq import nlargest as _nlargest
 import math
 from multiprocessing import Pool
-from packaging.version import parse
 from packaging.utils import canonicalize_name
 import sys
 sys.path.append("..")
 from kg_api.kg_query import QueryApplication
-from .variables import CANDIDATE_NUM
+from .variables import CANDIDATE_NUM, SIM_EXACT_MATCH
+from .bounded_cache import BoundedCache
+from .version_table import version_table
 
 
-def get_close_matches(calculator, word, n, process_num=4):
-    result = []
+# the calculator held by each worker of SimilarityPool
+_worker_calculator = None
+
+
+def _init_worker(calculator):
+    global _worker_calculator
+    _worker_calculator = calculator
+
+
+def _get_ratios_for_segment(word, seg_index, seg_num):
+    split_list = _worker_calculator.pkg_collections[seg_num*seg_index:seg_num*(seg_index+1)]
+    return _worker_calculator.get_ratios_for_pkgs(word, split_list)
+
+
+class SimilarityPool(object):
+    '''
+    long-lived processes for the similarity: the calculator is passed to each worker once (shared by fork),
+    and each task only contains the word and the index of the package segment
+    '''
+    def __init__(self, calculator, process_num=4):
+        self.process_num = process_num
+        self.seg_num = math.ceil(len(calculator.pkg_collections) / process_num)
+        self.process_pool = Pool(process_num, initializer=_init_worker, initargs=(calculator, ))
+    
+
+    def get_ratios(self, word):
+        return self.get_ratios_for_words([word, ])[0]
+    
+
+    def get_ratios_for_words(self, word_list):
+        # submit all words before waiting for the results
+        process_res = []
+        for word in word_list:
+            for i in range(self.process_num):
+                process_res.append(self.process_pool.apply_async(_get_ratios_for_segment, args=(word, i, self.seg_num)))
+
+        ret = []
+        for j in range(len(word_list)):
+            result = []
+            for item in process_res[j*self.process_num:(j+1)*self.process_num]:
+                result.extend(item.get())
+            ret.append(result)
+        
+        return ret
+    
+
+    def close(self):
+        # finish the running tasks
+        self.process_pool.close()
+        self.process_pool.join()
+
+
+class SimilarityCache(BoundedCache):
+    '''
+    LRU cache (bounded by memory) for unknown modules: {canonical module: ([(score, pkg), ], {pkg: [[version, spec, repos_spec], ]})}
+    '''
+    def __init__(self, max_bytes, cache_path=None, signature=None):
+        super().__init__(max_bytes)
+        self.cache_path = cache_path
+        # the signature of the KG: the cached results are invalid for other KGs
+        self.signature = signature
+
+        if cache_path is not None and os.path.isfile(cache_path):
+            with open(cache_path, 'rb') as f:
+                info = pickle.load(f)
+
+            # the entries with their costs, not in the files of the count-bounded cache
+            if info['signature'] == signature and 'bounded_entries' in info:
+                self.entries = info['bounded_entries']
+                self.size = sum(x[1] for x in self.entries.values())
+                self._evict()
+    
+
+    def save(self):
+        if self.cache_path is None:
+            return
+
+        with open(self.cache_path, 'wb') as f:
+            pickle.dump({'signature': self.signature, 'bounded_entries': self.entries}, f)
+
 
-    seg_num = math.ceil(len(calculator.pkg_collections) / process_num)
-    process_res = []
-    process_pool = Pool(process_num)
+def get_close_matches(calculator, word, n):
+    result = []
 
     cname = canonicalize_name(word)
 
-    for i in range(process_num):
-        # split to each thread
-        split_list = calculator.pkg_collections[seg_num*i:seg_num*(i+1)]
-        process_res.append(process_pool.apply_async(calculator.get_ratios_for_pkgs, args=(cname, split_list)))
+    if calculator.index is not None:
+        # only the packages sharing substrings with the word
+        result = calculator.index.get_ratios(cname)
+    elif calculator.vectorized:
+        # all packages in one pass
+        result = calculator.get_all_ratios(cname)
+    elif calculator.pool is not None:
+        # the long-lived processes
+        result = calculator.pool.get_ratios(cname)
+    else:
+        # no processes (SIM_PROCESS_NUM is 0)
+        result = calculator.get_ratios_for_pkgs(cname, calculator.pkg_collections)
 
-    process_pool.close()
-    process_pool.join()
+    return _select_matches(calculator, cname, result, n)
 
-    for item in process_res:
-        result.extend(item.get())
 
+def _select_matches(calculator, cname, result, n):
     # Move the best scorers to head of list
     result = _nlargest(n, result)
 
@@ -41,6 +127,20 @@ def get_close_matches(calculator, word, n, process_num=4):
     
     return result
 
+
+def get_close_matches_for_words(calculator, word_list, n):
+    '''
+    {cname: [(score, pkg), ]} for all words
+    '''
+    cname_list = [canonicalize_name(word) for word in word_list]
+
+    if calculator.index is None and not calculator.vectorized and calculator.pool is not None:
+        # all words in the long-lived processes at once
+        ratio_list = calculator.pool.get_ratios_for_words(cname_list)
+        return {cname: _select_matches(calculator, cname, result, n) for cname, result in zip(cname_list, ratio_list)}
+
+    return {cname: get_close_matches(calculator, cname, n) for cname in cname_list}
+
 # def get_close_matches(calculator, word, n=5, process_num=4):
 #     cname = canonicalize_name(word)
 #     if cname in calculator.pkg_alias_collections:
@@ -49,39 +149,84 @@ def get_close_matches(calculator, word, n, process_num=4):
 
 
 
+def _get_candidate_packages(kg_querier, calculator, cname_list):
+    # possible packages and all their versions: {cname: ([(score, pkg), ], {pkg: [[version, spec, repos_spec], ]})}
+    ret = {}
+    new_cnames = []
+    for cname in cname_list:
+        cache_res = calculator.cache.get(cname) if calculator.cache is not None else None
+        if cache_res is not None:
+            ret[cname] = cache_res
+        elif cname not in new_cnames:
+            new_cnames.append(cname)
+    
+    if len(new_cnames) == 0:
+        return ret
+
+    match_dict = {}
+    for cname in new_cnames:
+        if SIM_EXACT_MATCH and cname in calculator.pkg_alias_collections:
+            # the same name: skip the similarity
+            match_dict[cname] = [(1.0, cname), ]
+
+    rest_cnames = [x for x in new_cnames if x not in match_dict]
+    if len(rest_cnames) > 0:
+        match_dict.update(get_close_matches_for_words(calculator, rest_cnames, CANDIDATE_NUM))
+
+    # versions of all possible packages in one query
+    all_pkgs = set()
+    for pkg_list in match_dict.values():
+        all_pkgs.update([x[1] for x in pkg_list])
+
+    with kg_querier.driver.session(default_access_mode=neo4j.READ_ACCESS) as session:
+        version_info = session.read_transaction(QueryApplication.get_versions_lang_by_packages, list(all_pkgs))
+
+    for cname in new_cnames:
+        pkg_list = match_dict[cname]
+        version_dict = {x[1]: version_info.get(x[1], []) for x in pkg_list}
+
+        ret[cname] = (pkg_list, version_dict)
+        if calculator.cache is not None:
+            calculator.cache.put(cname, ret[cname])
+
+    return ret
+
+
 def get_similar_packages(kg_querier, calculator, unknown_modules):
     candidate_pvs = {}  # {top module: {pkg: [(version, spec, repos_spec, matching_degree), ]}}
     pkg_module_dict = {}    # {top_module: {pkg: similarity}}
 
-    with kg_querier.driver.session(default_access_mode=neo4j.READ_ACCESS) as session:
-        for top_module in unknown_modules:
-            cname = canonicalize_name(top_module)
-
-            # possible packages
-            pkg_list = get_close_matches(calculator, cname, CANDIDATE_NUM)
-            tmp = {}
-            similarity_tmp = {}
-            for score, pkg in pkg_list:
-                # all versions of the package
-                v_info = session.read_transaction(QueryApplication.get_versions_lang_by_package, pkg)
-                if len(v_info) > 0:
-                    if pkg not in tmp:
-                        tmp[pkg] = []
-                        similarity_tmp[pkg] = score
-
-                    for v_item in v_info:
-                        if score == 1.0 and pkg != cname:
-                            # distinguish the same name
-                            score = 0.99
-                        v_item.append(score)
-                        tmp[pkg].append(v_item)
-                        
-            if len(tmp) > 0:
-                # sort versions by version
-                for v_info in tmp.values():
-                    v_info.sort(key=lambda x:parse(x[0]), reverse=True)
-                
-                candidate_pvs[top_module] = tmp
-                pkg_module_dict[top_module] = similarity_tmp
+    # possible packages for all unknown modules
+    module_info = _get_candidate_packages(kg_querier, calculator, [canonicalize_name(x) for x in unknown_modules])
+
+    for top_module in unknown_modules:
+        cname = canonicalize_name(top_module)
+
+        # possible packages
+        pkg_list, version_dict = module_info[cname]
+        tmp = {}
+        similarity_tmp = {}
+        for score, pkg in pkg_list:
+            # all versions of the package
+            v_info = version_dict[pkg]
+            if len(v_info) > 0:
+                if pkg not in tmp:
+                    tmp[pkg] = []
+                    similarity_tmp[pkg] = score
+
+                for v_item in v_info:
+                    if score == 1.0 and pkg != cname:
+                        # distinguish the same name
+                        score = 0.99
+                    # copy: the cached versions are shared
+                    tmp[pkg].append(v_item + [score, ])
+                    
+        if len(tmp) > 0:
+            # sort versions by version
+            for pkg, v_info in tmp.items():
+                version_table.sort(pkg, v_info, key=lambda x:x[0], reverse=True)
+            
+            candidate_pvs[top_module] = tmp
+            pkg_module_dict[top_module] = similarity_tmp
     
     return candidate_pvs, pkg_module_dict
\ No newline at end of file
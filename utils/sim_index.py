@@ -0,0 +1,176 @@
+import os
+import pickle
+import hashlib
+import numpy as np
+from heapq import nlargest as _nlargest
+from .variables import SIM_THRESHOLD
+
+
+'''
+suffix array over all package names and aliases for the naming similarity
+a suffix is (name id, offset) in the arrays, compared against the names
+'''
+class SubstringIndex(object):
+    def __init__(self, calculator, index_path=None):
+        self.calculator = calculator
+        # built by the first search, and saved to index_path if it is not None
+        self.index_path = index_path
+        self.is_built = False
+
+        self.name_list = []                             # package names and aliases
+        self.name_owners = []                           # the package of each name
+        self.suffix_names = np.zeros(0, dtype=np.int32)     # the name id of each sorted suffix
+        self.suffix_offsets = np.zeros(0, dtype=np.int32)   # the start of each sorted suffix in its name
+
+
+    def _get_signature(self):
+        content = '\n'.join(self.calculator.pkg_collections).encode('utf-8')
+        return hashlib.sha1(content).hexdigest()
+
+
+    def build(self):
+        for pkg in self.calculator.pkg_collections:
+            self.name_list.append(pkg)
+            self.name_owners.append(pkg)
+
+            alias_name = self.calculator.pkg_alias_collections.get(pkg, None)
+            if alias_name is not None:
+                self.name_list.append(alias_name)
+                self.name_owners.append(pkg)
+
+        name_lengths = np.array([len(x) for x in self.name_list], dtype=np.int64)
+        suffix_names = np.repeat(np.arange(len(self.name_list), dtype=np.int32), name_lengths)
+        name_starts = np.cumsum(name_lengths) - name_lengths
+        suffix_offsets = (np.arange(len(suffix_names)) - np.repeat(name_starts, name_lengths)).astype(np.int32)
+
+        # group the suffixes by the first character, only the suffixes of one group are sliced to sort
+        first_chars = np.array([ord(c) for c in ''.join(self.name_list)], dtype=np.int32)
+        order = np.argsort(first_chars, kind='stable')
+        group_starts = np.flatnonzero(np.diff(first_chars[order])) + 1
+        name_list = self.name_list
+        for group in np.split(order, group_starts):
+            group_info = sorted(zip(suffix_names[group].tolist(), suffix_offsets[group].tolist()), key=lambda x: name_list[x[0]][x[1]:])
+            group[:] = [int(name_starts[i]) + j for i, j in group_info]
+
+        self.suffix_names = suffix_names[order]
+        self.suffix_offsets = suffix_offsets[order]
+        self.is_built = True
+
+
+    def load(self, index_path):
+        '''
+        load the index from index_path, or build and save it
+        '''
+        signature = self._get_signature()
+        if os.path.isfile(index_path):
+            with open(index_path, 'rb') as f:
+                info = pickle.load(f)
+
+            if info['signature'] == signature:
+                self.name_list, self.name_owners, self.suffix_names, self.suffix_offsets = info['index']
+                self.is_built = True
+                return
+
+        self.build()
+        with open(index_path, 'wb') as f:
+            info = {'signature': signature, 'index': (self.name_list, self.name_owners, self.suffix_names, self.suffix_offsets)}
+            pickle.dump(info, f)
+
+
+    def _ensure_built(self):
+        if self.is_built:
+            return
+
+        if self.index_path is None:
+            self.build()
+        else:
+            self.load(self.index_path)
+
+
+    def _get_bounds(self, l1, cutoff):
+        '''
+        the minimum length of the common substring, and the range of name lengths
+        '''
+        # real_quick_ratio: 2*min(l1, l2)/(l1+l2) >= cutoff
+        min_l2 = 1
+        while min_l2 < l1 and self.calculator._calculate_ratio(min_l2, l1 + min_l2) < cutoff:
+            min_l2 += 1
+
+        max_l2 = l1
+        while self.calculator._calculate_ratio(l1, l1 + max_l2 + 1) >= cutoff:
+            max_l2 += 1
+
+        # the shortest names require the shortest common substring
+        min_match = 1
+        while min_match < min_l2 and self.calculator._calculate_ratio(min_match, l1 + min_l2) < cutoff:
+            min_match += 1
+
+        return min_match, min_l2, max_l2
+
+
+    def _get_prefix(self, pos, length):
+        # the first length characters of the pos-th sorted suffix
+        offset = self.suffix_offsets[pos]
+        return self.name_list[self.suffix_names[pos]][offset:offset+length]
+
+
+    def _find_names(self, substr):
+        '''
+        ids of the names containing substr
+        '''
+        length = len(substr)
+
+        # the first suffix starting with substr
+        lo, hi = 0, len(self.suffix_names)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._get_prefix(mid, length) < substr:
+                lo = mid + 1
+            else:
+                hi = mid
+        start = lo
+
+        # the first suffix after them
+        hi = len(self.suffix_names)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._get_prefix(mid, length) <= substr:
+                lo = mid + 1
+            else:
+                hi = mid
+
+        return self.suffix_names[start:lo].tolist()
+
+
+    def get_ratios(self, word, cutoff=SIM_THRESHOLD):
+        '''
+        (score, pkg) for all pkgs with the score not less than cutoff
+        '''
+        l1 = len(word)
+        if l1 == 0 or cutoff <= 0.0 or cutoff > 1.0:
+            return self.calculator.get_all_ratios(word)
+
+        self._ensure_built()
+        min_match, min_l2, max_l2 = self._get_bounds(l1, cutoff)
+
+        # a matched name contains one substring of word with the length min_match
+        candidate_names = set()
+        for i in range(l1 - min_match + 1):
+            candidate_names.update(self._find_names(word[i:i+min_match]))
+
+        pkg_scores = {}
+        for name_id in candidate_names:
+            name = self.name_list[name_id]
+            if len(name) < min_l2 or len(name) > max_l2:
+                continue
+
+            score = self.calculator.ratio(word, name)
+            if score >= cutoff:
+                pkg = self.name_owners[name_id]
+                pkg_scores[pkg] = max(score, pkg_scores.get(pkg, 0.0))
+
+        return [(v, k) for k, v in pkg_scores.items()]
+
+
+    def get_top_ratios(self, word, n, cutoff=SIM_THRESHOLD):
+        return _nlargest(n, self.get_ratios(word, cutoff))
@@ -0,0 +1,249 @@
+from bisect import bisect_right
+from packaging.specifiers import SpecifierSet
+from packaging.version import parse
+from .version_table import version_table
+
+
+class IntervalSet(object):
+    '''
+    the ordinals in [bounds[0], bounds[1]), [bounds[2], bounds[3]), ...
+    '''
+    def __init__(self, bounds=()):
+        self.bounds = list(bounds)
+
+
+    @classmethod
+    def from_flags(cls, flags):
+        bounds = []
+        last_flag = False
+        for i, flag in enumerate(flags):
+            if flag != last_flag:
+                bounds.append(i)
+                last_flag = flag
+
+        if last_flag:
+            bounds.append(len(flags))
+
+        return cls(bounds)
+
+
+    def __contains__(self, ordinal):
+        return bisect_right(self.bounds, ordinal) % 2 == 1
+
+
+    def __len__(self):
+        return sum(self.bounds[i+1] - self.bounds[i] for i in range(0, len(self.bounds), 2))
+
+
+    def __repr__(self):
+        return 'IntervalSet({})'.format(self.bounds)
+
+
+    def _combine(self, other, keep):
+        # the membership is only changed at the bounds
+        bounds = []
+        last_flag = False
+        for point in sorted(set(self.bounds) | set(other.bounds)):
+            flag = keep(point in self, point in other)
+            if flag != last_flag:
+                bounds.append(point)
+                last_flag = flag
+
+        return IntervalSet(bounds)
+
+
+    def __and__(self, other):
+        return self._combine(other, lambda x, y: x and y)
+
+
+    def __or__(self, other):
+        return self._combine(other, lambda x, y: x or y)
+
+
+class VersionSet(object):
+    '''
+    the explicit versions allowed for a package, used as the specifier of a requirement
+    a version is contained if it is equal to one of the versions ('1.0' and '1.0.0' are equal)
+    '''
+    def __init__(self, versions):
+        self.str_versions = list(versions)
+        parsed_versions = set()
+        for version in self.str_versions:
+            try:
+                parsed_versions.add(version_table.parse(version))
+            except ValueError:
+                # invalid versions are never contained
+                pass
+        self.versions = frozenset(parsed_versions)
+
+
+    def __contains__(self, version):
+        if isinstance(version, str):
+            try:
+                version = version_table.parse(version)
+            except ValueError:
+                return False
+
+        return version in self.versions
+
+
+    def __len__(self):
+        return len(self.versions)
+
+
+    def __eq__(self, other):
+        return isinstance(other, VersionSet) and self.versions == other.versions
+
+
+    def __hash__(self):
+        return hash(self.versions)
+
+
+    def __str__(self):
+        if len(self.str_versions) == 1:
+            return '=={}'.format(self.str_versions[0])
+
+        return ' in ({})'.format(', '.join(self.str_versions))
+
+
+    def __repr__(self):
+        return '<VersionSet({!r})>'.format(str(self))
+
+
+class VersionSpace(object):
+    '''
+    the versions of a package (or the Python releases), the ordinal of a version is its index in versions
+    the specifiers are compiled once to the intervals of the ordinals they contain
+    '''
+    def __init__(self, versions):
+        # str or Version, the same as the items checked by the specifiers before
+        self.versions = list(versions)
+        self.ordinals = {}          # {str version: ordinal}
+        for i, version in enumerate(self.versions):
+            if isinstance(version, str) and version not in self.ordinals:
+                self.ordinals[version] = i
+
+        self.compiled = {}          # {repr(SpecifierSet): IntervalSet}
+        self._has_prereleases = None
+
+
+    def __len__(self):
+        return len(self.versions)
+
+
+    @property
+    def has_prereleases(self):
+        if self._has_prereleases is None:
+            self._has_prereleases = False
+            for version in self.versions:
+                try:
+                    if isinstance(version, str):
+                        version = parse(version)
+                    if version.is_prerelease:
+                        self._has_prereleases = True
+                        break
+                except ValueError:
+                    # the invalid versions are not handled by the intervals
+                    self._has_prereleases = True
+                    break
+
+        return self._has_prereleases
+
+
+    def compile(self, specifier):
+        '''
+        the intervals of the versions in the specifier (str, SpecifierSet or VersionSet)
+        '''
+        if isinstance(specifier, str):
+            specifier = specifier_engine.get_specifier(specifier)
+
+        if isinstance(specifier, VersionSet):
+            key = specifier
+        else:
+            # the prereleases of SpecifierSet are in repr
+            key = repr(specifier)
+        if key not in self.compiled:
+            self.compiled[key] = IntervalSet.from_flags([version in specifier for version in self.versions])
+
+        return self.compiled[key]
+
+
+    def compile_all(self, specifiers):
+        '''
+        the intervals of the versions in the intersection (&) of the specifiers
+        '''
+        if not self.has_prereleases:
+            # the prerelease rules of the merged specifiers are not used by the final versions
+            ret = IntervalSet([0, len(self.versions)]) if self.versions else IntervalSet()
+            for specifier in specifiers:
+                ret = ret & self.compile(specifier)
+            return ret
+
+        # the version sets do not depend on the prerelease rules
+        version_sets = []
+        merged_specifier = None
+        for specifier in specifiers:
+            if isinstance(specifier, str):
+                specifier = specifier_engine.get_specifier(specifier)
+            if isinstance(specifier, VersionSet):
+                version_sets.append(specifier)
+            elif merged_specifier is None:
+                merged_specifier = specifier_engine.get_specifier('') & specifier
+            else:
+                merged_specifier &= specifier
+
+        if merged_specifier is None:
+            ret = IntervalSet([0, len(self.versions)]) if self.versions else IntervalSet()
+        else:
+            ret = self.compile(merged_specifier)
+        for version_set in version_sets:
+            ret = ret & self.compile(version_set)
+        return ret
+
+
+    def select(self, versions, intervals):
+        # the str versions in the intervals, in the order of versions
+        return [x for x in versions if self.ordinals[x] in intervals]
+
+
+class SpecifierEngine(object):
+    '''
+    the specifier strings are parsed once, and the checks of single versions are memorized
+    '''
+    def __init__(self):
+        self.specifiers = {}        # {(spec str, prereleases): SpecifierSet}
+        self.memberships = {}       # {(spec str, version str): bool}
+
+
+    def __len__(self):
+        return len(self.specifiers) + len(self.memberships)
+
+
+    def clear(self):
+        self.specifiers = {}
+        self.memberships = {}
+
+
+    def get_specifier(self, spec_str, prereleases=None):
+        key = (spec_str, prereleases)
+        specifier = self.specifiers.get(key, None)
+        if specifier is None:
+            specifier = self.specifiers[key] = SpecifierSet(spec_str, prereleases=prereleases)
+
+        return specifier
+
+
+    def contains(self, spec_str, version):
+        '''
+        version (str) in SpecifierSet(spec_str)
+        '''
+        key = (spec_str, version)
+        ret = self.memberships.get(key, None)
+        if ret is None:
+            ret = self.memberships[key] = version in self.get_specifier(spec_str)
+
+        return ret
+
+
+# the engine shared by the discovery, the environment generation and the resolution
+specifier_engine = SpecifierEngine()
@@ -0,0 +1,95 @@
+'''
+interned dotted names ('a.b.c') shared by the pipeline: each name is interned once with its parent and segments
+'''
+class SymbolTable(object):
+    def __init__(self):
+        self.ids = {}           # {name: id}
+        self.names = []         # name of each id
+        self.parents = []       # the id of the parent name ('a.b' for 'a.b.c'), -1 for top names
+        self.segments = []      # the segments of each name, same as name.split('.')
+
+
+    def __len__(self):
+        return len(self.names)
+
+
+    def clear(self):
+        self.ids = {}
+        self.names = []
+        self.parents = []
+        self.segments = []
+
+
+    def intern(self, name):
+        # all prefixes of name are also interned
+        sid = self.ids.get(name)
+        if sid is not None:
+            return sid
+
+        pos = name.rfind('.')
+        if pos < 0:
+            parent = -1
+            segments = (name, )
+        else:
+            parent = self.intern(name[:pos])
+            segments = self.segments[parent] + (name[pos+1:], )
+
+        sid = len(self.names)
+        self.ids[name] = sid
+        self.names.append(name)
+        self.parents.append(parent)
+        self.segments.append(segments)
+        return sid
+
+
+    def intern_all(self, names):
+        return {self.intern(name) for name in names}
+
+
+    def get_name(self, sid):
+        return self.names[sid]
+
+
+    def get_top(self, sid):
+        return self.segments[sid][0]
+
+
+    def get_depth(self, sid):
+        return len(self.segments[sid])
+
+
+    def get_ancestor(self, sid, depth):
+        '''
+        the prefix with depth segments, or the name itself if it is not deeper
+        '''
+        for _ in range(len(self.segments[sid]) - depth):
+            sid = self.parents[sid]
+
+        return sid
+
+
+    def get_prefixes(self, sid):
+        '''
+        ids of all prefixes of the name (the name itself included), from the top name
+        '''
+        ret = []
+        while sid >= 0:
+            ret.append(sid)
+            sid = self.parents[sid]
+
+        ret.reverse()
+        return ret
+
+
+    def has_prefix_in(self, sid, prefix_ids):
+        # the name or one of its prefixes is in prefix_ids
+        while sid >= 0:
+            if sid in prefix_ids:
+                return True
+            sid = self.parents[sid]
+
+        return False
+
+
+# the table shared by the parser and the discovery
+symbol_table = SymbolTable()
@@ -4,6 +4,65 @@ CANDIDATE_NUM = VALIDATION_NUM + 1
 
 SIM_THRESHOLD = 0.6
 
+# substring index for similar packages, built for the first unknown module and saved to SIM_INDEX_FILE if it is not None
+SIM_INDEX = True
+SIM_INDEX_FILE = None
+
+# long-lived processes for the similarity, only the fallback of the non-vectorized calculators without the index
+# (not used by default: SIM_INDEX and BatchNamingSimilarity), the similarity is sequential if it is 0
+SIM_PROCESS_NUM = 4
+
+# cached similar packages for unknown modules (bounded by memory), saved to SIM_CACHE_FILE if it is not None
+SIM_CACHE_BYTES = 64 * 1024 * 1024
+SIM_CACHE_FILE = None
+# only use the package with the same name if it exists
+SIM_EXACT_MATCH = False
+
+# candidate versions of the dependencies in the resolution: the newest versions of each major.minor series (by upload time),
+# widened to the next sizes and then to all versions if the resolution fails
+VERSION_WINDOW_SIZES = [5, 20]
+# the earliest upload time of candidate versions (None: no date range)
+VERSION_WINDOW_SINCE = None
+
+# cached KG results of the resolution (the versions and the requirements of packages), bounded by memory
+KG_CACHE_BYTES = 256 * 1024 * 1024
+
+# cached discovery results for batch runs: the Python releases by the standard imports and syntax,
+# the candidates of each top module by its imports, bounded by memory (0: no cache)
+DISCOVERY_CACHE_BYTES = 64 * 1024 * 1024
+
+# processes for parsing the files of a project (0: sequential)
+PARSE_PROCESS_NUM = 4
+
+# cached parse results by the content hash of files, saved in PARSE_CACHE_DIR if it is not None
+PARSE_CACHE_SIZE = 2048
+PARSE_CACHE_DIR = None
+
+# the built tree-sitter grammar, named by the hash of the grammar sources (None: $LANGUAGE_DIR/build)
+PARSE_GRAMMAR_DIR = None
+
+# the files not parsed in projects (.gitignore-style, the .gitignore files of projects are also used),
+# they are still local modules (build outputs)
+PARSE_IGNORE_PATTERNS = ['*.egg-info/', 'build/', 'dist/']
+# the vendored and VCS directories, never entered (.gitignore-style directory patterns)
+PARSE_PRUNE_PATTERNS = ['.git/', '.hg/', '.svn/', '__pycache__/', '.tox/', '.nox/', '.eggs/', '.venv/', 'venv/',\
+                        'site-packages/', 'dist-packages/', 'node_modules/']
+# the budgets for a project: bytes of a file and the number of files (0: no limit)
+PARSE_MAX_FILE_SIZE = 1024 * 1024
+PARSE_MAX_FILE_NUM = 10000
+
+# seed the inference from requirements.txt, setup.py (install_requires) and Pipfile of projects
+PARSE_MANIFESTS = True
+
+# the interned dotted names shared by the pipeline, cleared before a program if it has more names
+SYMBOL_TABLE_SIZE = 1000000
+
+# the interned versions with their ranks, cleared before a program if it has more versions
+VERSION_TABLE_SIZE = 1000000
+
+# the parsed specifiers and the memorized checks of versions, cleared before a program if it has more items
+SPECIFIER_ENGINE_SIZE = 1000000
+
 NEO4J_URI = 'bolt://localhost:7687'
 NEO4J_USER = 'neo4j'
 NEO4J_PWD = 'neo4j'
\ No newline at end of file
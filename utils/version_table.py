@@ -0,0 +1,80 @@
+from packaging.version import parse
+
+
+# the ranks of the Python releases, not a package name
+PYTHON_RELEASES = ':python'
+
+'''
+interned versions: each version string is parsed once, and the versions of a package are ranked for sorting
+'''
+class VersionTable(object):
+    def __init__(self):
+        self.parsed = {}        # {version str: Version}
+        self.ranks = {}         # {package: {version str: rank}}, the equal versions ('1.0', '1.0.0') have the same rank
+        self.unranked = set()   # the packages with new versions
+
+
+    def __len__(self):
+        return len(self.parsed)
+
+
+    def clear(self):
+        self.parsed = {}
+        self.ranks = {}
+        self.unranked = set()
+
+
+    def parse(self, version):
+        ret = self.parsed.get(version, None)
+        if ret is None:
+            ret = self.parsed[version] = parse(version)
+
+        return ret
+
+
+    def add(self, package, versions):
+        package_ranks = self.ranks.get(package, None)
+        if package_ranks is None:
+            package_ranks = self.ranks[package] = {}
+
+        for version in versions:
+            if version not in package_ranks:
+                package_ranks[version] = None
+                self.unranked.add(package)
+
+
+    def get_ranks(self, package, versions=()):
+        '''
+        {version str: rank} of the package, the versions are added before ranking
+        '''
+        self.add(package, versions)
+
+        package_ranks = self.ranks[package]
+        if package in self.unranked:
+            rank = -1
+            last_version = None
+            for version in sorted(package_ranks, key=self.parse):
+                parsed_version = self.parse(version)
+                if parsed_version != last_version:
+                    rank += 1
+                    last_version = parsed_version
+                package_ranks[version] = rank
+
+            self.unranked.discard(package)
+
+        return package_ranks
+
+
+    def sort(self, package, items, key=None, reverse=False):
+        '''
+        sort the items (in place) by their versions, key(item) is the version str
+        '''
+        if key is None:
+            key = lambda x: x
+
+        package_ranks = self.get_ranks(package, [key(x) for x in items])
+        items.sort(key=lambda x: package_ranks[key(x)], reverse=reverse)
+
+
+# the table shared by the discovery and the dependency solving
+version_table = VersionTable()
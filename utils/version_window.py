@@ -0,0 +1,78 @@
+'''
+bounded candidate versions of packages, the windows are applied to the versions from the KG
+'''
+import re
+
+
+# the leading numeric parts of a version: [epoch!]major[.minor], the pre-, post- and dev-releases are in the same series
+series_pattern = re.compile(r'^\s*v?(?:(\d+)!)?(\d+)(?:\.(\d+))?', re.I)
+
+
+def get_series(version):
+    '''
+    (epoch, major, minor) of the version, '1.0rc1', '1.0.post1' and '1.0.3' are in the series (0, 1, 0)
+    '''
+    match_obj = re.match(series_pattern, version)
+    if match_obj is None:
+        # invalid versions: a series of its own
+        return version
+
+    epoch, major, minor = match_obj.groups()
+    return (int(epoch or 0), int(major), int(minor or 0))
+
+
+class VersionWindow(object):
+    '''
+    the newest size versions (by upload time) of each major.minor series, uploaded since the time
+    size 0: all versions of the series, since None: no date range
+    the versions without upload time are always kept
+    '''
+    def __init__(self, size=0, since=None):
+        self.size = size
+        self.since = since
+
+
+    def __repr__(self):
+        return 'VersionWindow(size={}, since={})'.format(self.size, self.since)
+
+
+    def is_full(self):
+        # all versions are candidates
+        return self.size <= 0 and self.since is None
+
+
+    def select(self, items, key):
+        '''
+        the items in the window, in their order, key(item) is (version str, upload time or None)
+        '''
+        if self.is_full():
+            return list(items)
+
+        # {series: [(upload time, index), ]}
+        series_dict = {}
+        undated = set()
+        for i, item in enumerate(items):
+            version, upload_time = key(item)
+            if upload_time is None:
+                undated.add(i)
+            elif self.since is None or upload_time >= self.since:
+                series_dict.setdefault(get_series(version), []).append((upload_time, i))
+
+        kept = undated
+        for dated_list in series_dict.values():
+            dated_list.sort(key=lambda x: x[0], reverse=True)
+            if self.size > 0:
+                dated_list = dated_list[:self.size]
+            kept.update(x[1] for x in dated_list)
+
+        return [item for i, item in enumerate(items) if i in kept]
+
+
+def get_version_windows(sizes, since=None):
+    '''
+    the windows tried in order when the resolution fails, ended with all versions of the series
+    '''
+    windows = [VersionWindow(size, since) for size in sizes if size > 0]
+    windows.append(VersionWindow(0, since))
+
+    return windows